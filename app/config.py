@@ -3,16 +3,71 @@ from typing import List
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./taskmanagement.db"
+    TASK_SHARDS: str = ""
     SECRET_KEY: str = "your-secret-key-change-this"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    TOKEN_DENYLIST_SYNC_SECONDS: int = 30
+    TOKEN_DENYLIST_BLOOM: bool = False
+    TOKEN_DENYLIST_BLOOM_CAPACITY: int = 100000
     API_V1_PREFIX: str = "/api/v1"
     PROJECT_NAME: str = "Task Management API"
     DEBUG: bool = True
     ALLOWED_ORIGINS: str = "http://localhost:3000,http://localhost:8000"
     RATE_LIMIT_PER_MINUTE: int = 100
     RATE_LIMIT_PERIOD: int = 15
+    ACCESS_LOG_PATH: str = ""
+    ACCESS_LOG_MAX_BYTES: int = 52428800
+    ACCESS_LOG_BACKUPS: int = 5
+    ACCESS_LOG_BATCH_SIZE: int = 256
+    ACCESS_LOG_FLUSH_INTERVAL_SECONDS: float = 0.5
+    ACCESS_LOG_QUEUE_SIZE: int = 10000
+    ACCESS_LOG_SAMPLE_RATES: str = ""
+    ACCESS_LOG_SLOW_MS: float = 500
+    TRAFFIC_CAPTURE_PATH: str = ""
+    TRAFFIC_CAPTURE_SAMPLE_RATE: float = 1.0
+    TRACE_ENABLED: bool = False
+    TRACE_SAMPLE_RATE: float = 0.01
+    TRACE_TAIL_LATENCY_MS: float = 500
+    TRACE_BUFFER_SIZE: int = 500
+    TRACE_FILE_PATH: str = ""
+    THREADPOOL_SIZE: int = 40
+    ADMISSION_AUTH_CONCURRENCY: int = 8
+    ADMISSION_READ_CONCURRENCY: int = 24
+    ADMISSION_WRITE_CONCURRENCY: int = 12
+    ADMISSION_ADMIN_CONCURRENCY: int = 4
+    ADMISSION_QUEUE_SIZE: int = 64
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    BATCH_MAX_OPERATIONS: int = 20
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+    IDEMPOTENCY_WAIT_SECONDS: float = 30
+    IDEMPOTENCY_LEASE_SECONDS: float = 60
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+    ZSTD_LEVEL: int = 3
+    TASK_LIST_CACHE_SIZE: int = 1024
+    TASK_LIST_CACHE_MAX_BYTES: int = 1048576
+    TASK_LIST_CACHE_TTL_SECONDS: int = 30
+    PROVISIONING_HASH_WORKERS: int = 0
+    PROVISIONING_BATCH_SIZE: int = 1000
+    PROVISIONING_MAX_ROWS: int = 50000
+    USER_DELETE_CHUNK_SIZE: int = 1000
+    USER_DELETE_BACKGROUND_THRESHOLD: int = 10000
+    ARCHIVE_AFTER_DAYS: int = 90
+    ARCHIVE_CHUNK_SIZE: int = 500
+    TASK_HISTORY_BATCH_SIZE: int = 500
+    TASK_HISTORY_FLUSH_INTERVAL_SECONDS: float = 1.0
+    TASK_HISTORY_QUEUE_SIZE: int = 100000
+    LABEL_INDEX_REFRESH_SECONDS: int = 60
+    LABEL_FILTER_MAX_IDS: int = 5000
+    
+    @property
+    def task_shard_urls(self) -> List[str]:
+        return [url.strip() for url in self.TASK_SHARDS.split(",") if url.strip()]
     
     @property
     def allowed_origins_list(self) -> List[str]:
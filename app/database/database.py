@@ -1,18 +1,45 @@
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.utils.tracing import span
 
 engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if settings.task_shard_urls:
+    from app.database.sharding import sharded_sessionmaker
+    SessionLocal = sharded_sessionmaker(engine, settings.task_shard_urls)
+else:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    shared = getattr(request.state, "batch_db", None)
+    if shared is not None:
+        yield shared
+        return
+    with span("db.session"):
+        db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+def is_sharded(db) -> bool:
+    from sqlalchemy.ext.horizontal_shard import ShardedSession
+    return isinstance(db, ShardedSession)
+
+def supports_returning(db) -> bool:
+    # Shards are SQLite files served by the same library as the primary engine.
+    dialect = engine.dialect if is_sharded(db) else db.get_bind().dialect
+    return dialect.insert_returning and dialect.update_returning
+
 def create_tables():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    from app.database.migrations import run_migrations, create_missing_indexes
+    with engine.begin() as connection:
+        run_migrations(connection)
+        Base.metadata.create_all(bind=connection)
+        create_missing_indexes(connection)
+    if settings.task_shard_urls:
+        from app.database.sharding import create_shard_tables
+        create_shard_tables(Base.metadata)
\ No newline at end of file
@@ -0,0 +1,84 @@
+import logging
+from sqlalchemy import Integer, inspect, text
+from sqlalchemy.engine import Connection
+from app.database.database import Base
+
+logger = logging.getLogger(__name__)
+
+def _coded_case(column: str, values, default: str) -> str:
+    whens = " ".join(f"WHEN '{value}' THEN {code}" for code, value in enumerate(values))
+    return f"CASE {column} {whens} ELSE {values.index(default)} END"
+
+def _log_coerced_rows(connection: Connection, statuses, priorities) -> None:
+    # Unknown or NULL legacy values fall through to the CASE default; leave a record of which rows that touched.
+    def known(column, values):
+        return f"{column} IN ({', '.join(repr(value) for value in values)})"
+    rows = connection.execute(text(f"SELECT id, status, priority FROM tasks WHERE NOT ({known('status', statuses)}) OR status IS NULL "
+                                   f"OR NOT ({known('priority', priorities)}) OR priority IS NULL ORDER BY id")).all()
+    if rows:
+        logger.warning("Coercing %d tasks with unknown status/priority to pending/medium: %s", len(rows),
+                       ", ".join(f"{row.id} ({row.status!r}/{row.priority!r})" for row in rows))
+
+def migrate_task_codes(connection: Connection) -> None:
+    from app.models.task import Task, TASK_STATUSES, TASK_PRIORITIES
+    inspector = inspect(connection)
+    if not inspector.has_table("tasks"):
+        return
+    columns = {column["name"]: column for column in inspector.get_columns("tasks")}
+    if isinstance(columns["status"]["type"], Integer):
+        return
+    status_case = _coded_case("status", TASK_STATUSES, "pending")
+    priority_case = _coded_case("priority", TASK_PRIORITIES, "medium")
+    _log_coerced_rows(connection, TASK_STATUSES, TASK_PRIORITIES)
+    if connection.dialect.name == "sqlite":
+        # SQLite cannot change a column type in place: rebuild the table and copy the rows across.
+        for index in inspector.get_indexes("tasks"):
+            connection.execute(text(f'DROP INDEX "{index["name"]}"'))
+        connection.execute(text("ALTER TABLE tasks RENAME TO tasks_legacy"))
+        Task.__table__.create(connection)
+        shared = [name for name in Task.__table__.c.keys() if name in columns]
+        selected = [status_case if name == "status" else priority_case if name == "priority" else name for name in shared]
+        connection.execute(text(f"INSERT INTO tasks ({', '.join(shared)}) SELECT {', '.join(selected)} FROM tasks_legacy"))
+        connection.execute(text("DROP TABLE tasks_legacy"))
+        return
+    connection.execute(text(f"ALTER TABLE tasks ALTER COLUMN status TYPE SMALLINT USING {status_case}"))
+    connection.execute(text(f"ALTER TABLE tasks ALTER COLUMN priority TYPE SMALLINT USING {priority_case}"))
+    for constraint in Task.__table__.constraints:
+        if constraint.name in ("ck_tasks_status", "ck_tasks_priority"):
+            connection.execute(text(f"ALTER TABLE tasks ADD CONSTRAINT {constraint.name} CHECK ({constraint.sqltext})"))
+
+def add_missing_columns(connection: Connection) -> None:
+    # New model columns on existing tables; they need a server default (or to be nullable) to be added in place.
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(connection.dialect)}"
+            if column.server_default is not None:
+                default = column.server_default.arg
+                default = default.text if hasattr(default, "text") else "'" + str(default).replace("'", "''") + "'"
+                ddl += f" DEFAULT {default}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            connection.execute(text(ddl))
+
+def create_missing_indexes(connection: Connection) -> None:
+    # create_all only creates indexes together with their table, so indexes added to existing models are created here.
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+
+MIGRATIONS = [migrate_task_codes, add_missing_columns]
+
+def run_migrations(connection: Connection) -> None:
+    for migration in MIGRATIONS:
+        migration(connection)
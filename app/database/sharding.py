@@ -0,0 +1,202 @@
+from typing import Dict, List, Optional
+from sqlalchemy import create_engine, delete, func, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList
+from sqlalchemy.sql.expression import TableClause
+from sqlalchemy.sql.util import find_tables
+
+PRIMARY = "primary"
+# Each shard hands out task ids from its own range so ids stay globally unique; ids below the
+# first range belong to tasks created before sharding was enabled.
+SHARD_ID_BITS = 40
+# Tables partitioned by task owner; every other table lives in the primary database.
+SHARDED_TABLES = {"tasks"}
+
+shard_engines: Dict[str, Engine] = {}
+
+def shard_name(index: int) -> str:
+    return f"shard{index}"
+
+def task_shard_ids() -> List[str]:
+    return list(shard_engines)
+
+def shard_for_user(user_id: int) -> str:
+    return shard_name(int(user_id) % len(shard_engines))
+
+def shard_id_range(shard_id: str) -> tuple:
+    base = (int(shard_id[len("shard"):]) + 1) << SHARD_ID_BITS
+    return base, base + (1 << SHARD_ID_BITS)
+
+def _table_names(statement) -> set:
+    return {table.name for table in find_tables(statement, check_columns=True, include_joins=True, include_crud=True)
+            if isinstance(table, TableClause)}
+
+def _owner_from_criteria(statement) -> Optional[int]:
+    # Only a top-level "tasks.created_by = :value" pins a query to one shard; under an OR it does not.
+    criteria = getattr(statement, "_where_criteria", ())
+    for criterion in criteria:
+        clauses = criterion.clauses if isinstance(criterion, BooleanClauseList) and criterion.operator is operators.and_ else [criterion]
+        for clause in clauses:
+            if (isinstance(clause, BinaryExpression) and clause.operator is operators.eq
+                    and getattr(clause.left, "table", None) is not None and clause.left.table.name == "tasks"
+                    and clause.left.key == "created_by" and isinstance(clause.right, BindParameter)):
+                return clause.right.effective_value
+    return None
+
+def shard_chooser(mapper, instance, clause=None):
+    if mapper is None or mapper.local_table.name not in SHARDED_TABLES:
+        return PRIMARY
+    if instance is not None and getattr(instance, "created_by", None) is not None:
+        return shard_for_user(instance.created_by)
+    raise ValueError(f"Cannot choose a shard for {mapper.class_.__name__} without its owner")
+
+def identity_chooser(mapper, primary_key, *, lazy_loaded_from, execution_options, bind_arguments, **kw):
+    if mapper.local_table.name not in SHARDED_TABLES:
+        return [PRIMARY]
+    if lazy_loaded_from is not None and lazy_loaded_from.identity_token is not None:
+        return [lazy_loaded_from.identity_token]
+    return task_shard_ids()
+
+def execute_chooser(orm_context):
+    statement = orm_context.statement
+    tables = _table_names(statement)
+    if tables and not tables & SHARDED_TABLES:
+        return [PRIMARY]
+    if orm_context.is_insert:
+        owner = statement.compile().params.get("created_by")
+    else:
+        owner = _owner_from_criteria(statement)
+    if owner is not None:
+        return [shard_for_user(owner)]
+    return task_shard_ids()
+
+def merge_counts(rows) -> tuple:
+    # Aggregates come back as one row per shard when a query scatters; with a single database there is one row.
+    return tuple(sum(value or 0 for value in column) for column in zip(*rows))
+
+def sort_merged(rows: list, attribute: str, descending: bool = False) -> list:
+    # Re-applies "ORDER BY <attribute>, id" to results concatenated from several shards.
+    from app.models.task import Task
+    column_type = Task.__table__.c[attribute].type
+    codes = getattr(column_type, "codes", None)
+    def key(row):
+        value = getattr(row, attribute)
+        return (value is not None, codes[value] if codes and value is not None else value)
+    rows.sort(key=lambda row: row.id)
+    rows.sort(key=key, reverse=descending)
+    return rows
+
+def configure_shards(shard_urls: List[str]) -> None:
+    shard_engines.clear()
+    for index, url in enumerate(shard_urls):
+        if not url.startswith("sqlite"):
+            raise ValueError("Task shards must be SQLite database URLs")
+        shard_engines[shard_name(index)] = create_engine(url, connect_args={"check_same_thread": False})
+
+def sharded_sessionmaker(primary: Engine, shard_urls: List[str]) -> sessionmaker:
+    configure_shards(shard_urls)
+    return sessionmaker(class_=ShardedSession, autocommit=False, autoflush=False,
+                        shards={PRIMARY: primary, **shard_engines}, shard_chooser=shard_chooser,
+                        identity_chooser=identity_chooser, execute_chooser=execute_chooser)
+
+def reset_id_sequence(connection, shard_id: str) -> None:
+    base, limit = shard_id_range(shard_id)
+    connection.execute(text("INSERT INTO sqlite_sequence (name, seq) SELECT 'tasks', :base "
+                            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'tasks')"), {"base": base})
+    # Rows moved in from other shards can push the sequence into a foreign range; pull it back without reusing ids.
+    connection.execute(text("UPDATE sqlite_sequence SET seq = MAX("
+                            "(SELECT COALESCE(MAX(id), :base) FROM tasks WHERE id >= :base AND id < :limit), "
+                            "CASE WHEN seq >= :base AND seq < :limit THEN seq ELSE :base END) WHERE name = 'tasks'"),
+                       {"base": base, "limit": limit})
+
+def create_shard_tables(metadata) -> None:
+    from app.database.migrations import run_migrations, create_missing_indexes
+    tables = [table for table in metadata.sorted_tables if table.name in SHARDED_TABLES]
+    for shard_id, shard_engine in shard_engines.items():
+        with shard_engine.begin() as connection:
+            run_migrations(connection)
+            metadata.create_all(bind=connection, tables=tables)
+            create_missing_indexes(connection)
+            reset_id_sequence(connection, shard_id)
+
+def rebalance(primary: Engine, chunk_size: int = 1000) -> Dict[str, int]:
+    # Moves every task whose owner maps to another shard (including tasks still in the primary
+    # database) to its home shard, keeping task ids. Safe to re-run after an interruption.
+    from app.models.task import Task
+    tasks = Task.__table__
+    sources = {PRIMARY: primary, **shard_engines}
+    moved = {shard_id: 0 for shard_id in shard_engines}
+    for source_id, source in sources.items():
+        with source.connect() as connection:
+            if not source.dialect.has_table(connection, "tasks"):
+                continue
+        misplaced = select(tasks).order_by(tasks.c.id).limit(chunk_size)
+        if source_id != PRIMARY:
+            misplaced = misplaced.where(tasks.c.created_by % len(shard_engines) != int(source_id[len("shard"):]))
+        while True:
+            with source.connect() as connection:
+                rows = [dict(row) for row in connection.execute(misplaced).mappings()]
+            if not rows:
+                break
+            by_shard: Dict[str, list] = {}
+            for row in rows:
+                by_shard.setdefault(shard_for_user(row["created_by"]), []).append(row)
+            for target_id, target_rows in by_shard.items():
+                with shard_engines[target_id].begin() as connection:
+                    connection.execute(insert(tasks).prefix_with("OR REPLACE"), target_rows)
+                moved[target_id] += len(target_rows)
+            with source.begin() as connection:
+                connection.execute(delete(tasks).where(tasks.c.id.in_([row["id"] for row in rows])))
+    for shard_id, shard_engine in shard_engines.items():
+        with shard_engine.begin() as connection:
+            reset_id_sequence(connection, shard_id)
+    return moved
+
+def move_owner_tasks(primary: Engine, owner_id: int, chunk_size: int = 1000) -> int:
+    # Moves one owner's tasks (e.g. just reassigned to them) to their home shard. Each chunk is removed from its
+    # source with DELETE ... RETURNING, which holds the source's write lock until the copy is committed, so an
+    # edit made meanwhile either lands before the move or waits and then finds the task in its new shard.
+    from app.models.task import Task
+    tasks = Task.__table__
+    home = shard_for_user(owner_id)
+    moved = 0
+    for source_id, source in {PRIMARY: primary, **shard_engines}.items():
+        if source_id == home:
+            continue
+        with source.connect() as connection:
+            if not source.dialect.has_table(connection, "tasks"):
+                continue
+        while True:
+            with source.begin() as connection:
+                owned = select(tasks.c.id).where(tasks.c.created_by == owner_id).limit(chunk_size)
+                rows = [dict(row) for row in connection.execute(delete(tasks).where(tasks.c.id.in_(owned)).returning(*tasks.c)).mappings()]
+                if rows:
+                    with shard_engines[home].begin() as target:
+                        target.execute(insert(tasks).prefix_with("OR REPLACE"), rows)
+            moved += len(rows)
+            if len(rows) < chunk_size:
+                break
+    with shard_engines[home].begin() as connection:
+        reset_id_sequence(connection, home)
+    return moved
+
+def shard_row_counts() -> Dict[str, int]:
+    from app.models.task import Task
+    counts = {}
+    for shard_id, shard_engine in shard_engines.items():
+        with shard_engine.connect() as connection:
+            counts[shard_id] = connection.execute(select(func.count()).select_from(Task.__table__)).scalar()
+    return counts
+
+if __name__ == "__main__":
+    # Run as "python -m app.database.sharding"; go through the imported module so the configured engines are used.
+    from app.main import app  # noqa: F401  imports every model and creates the shard tables
+    from app.database import sharding
+    from app.database.database import engine
+    if not sharding.shard_engines:
+        raise SystemExit("TASK_SHARDS is not configured")
+    print(f"Moved: {sharding.rebalance(engine)}")
+    print(f"Tasks per shard: {sharding.shard_row_counts()}")
@@ -0,0 +1,28 @@
+from sqlalchemy import SmallInteger
+from sqlalchemy.types import TypeDecorator
+
+class CodedString(TypeDecorator):
+    # Stores one of a fixed, ordered set of strings as its position in that set.
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, values):
+        super().__init__()
+        self.values = tuple(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return self.codes[value]
+        except KeyError:
+            raise ValueError(f"{value!r} is not one of {', '.join(self.values)}")
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.values[value]
+
+    def check_expression(self, column_name: str) -> str:
+        return f"{column_name} BETWEEN 0 AND {len(self.values) - 1}"
@@ -1,11 +1,25 @@
+from anyio import to_thread
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from slowapi.errors import RateLimitExceeded
 from app.config import settings
-from app.database.database import create_tables
-from app.routes import auth, tasks, admin
+from app.database.database import SessionLocal, create_tables, engine
+from app.database.sharding import shard_engines
+from app.routes import auth, tasks, admin, batch
 from app.middleware.rate_limit import limiter
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.admission import AdmissionControlMiddleware
+from app.middleware.access_log import AccessLogMiddleware, parse_sample_rates
+from app.middleware.tracing import TracingMiddleware
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.middleware.traffic_capture import TrafficCaptureMiddleware
+from app.services.task_history import task_history
+from app.utils.idempotency import IdempotencyStore
+from app.utils.log_writer import AsyncLogWriter
+from app.utils.tracing import instrument_engine, instrument_sessions, trace_writer, tracer
+from app.utils.revocation import denylist
+from app.utils.label_index import label_index
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -16,6 +30,78 @@ app = FastAPI(
 
 app.state.limiter = limiter
 
+app.add_middleware(
+    AdmissionControlMiddleware,
+    prefix=settings.API_V1_PREFIX,
+    limits={
+        "auth": settings.ADMISSION_AUTH_CONCURRENCY,
+        "reads": settings.ADMISSION_READ_CONCURRENCY,
+        "writes": settings.ADMISSION_WRITE_CONCURRENCY,
+        "admin": settings.ADMISSION_ADMIN_CONCURRENCY,
+    },
+    max_queue=settings.ADMISSION_QUEUE_SIZE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+    batch_paths=[settings.API_V1_PREFIX + "/batch"],
+)
+
+idempotency_store = IdempotencyStore(engine, max_entries=settings.IDEMPOTENCY_CACHE_SIZE, ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+                                     lease_seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=idempotency_store,
+    paths=[settings.API_V1_PREFIX + path for path in ("/tasks", "/batch", "/admin/users/import", "/auth/register")],
+    wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    levels={"gzip": settings.GZIP_LEVEL, "br": settings.BROTLI_QUALITY, "zstd": settings.ZSTD_LEVEL},
+)
+
+if settings.TRACE_ENABLED:
+    for traced_engine in [engine, *shard_engines.values()]:
+        instrument_engine(traced_engine)
+    instrument_sessions(SessionLocal)
+    app.add_middleware(TracingMiddleware, tracer=tracer, prefix=settings.API_V1_PREFIX)
+
+access_log_writer = None
+if settings.ACCESS_LOG_PATH:
+    access_log_writer = AsyncLogWriter(
+        settings.ACCESS_LOG_PATH,
+        max_bytes=settings.ACCESS_LOG_MAX_BYTES,
+        backups=settings.ACCESS_LOG_BACKUPS,
+        batch_size=settings.ACCESS_LOG_BATCH_SIZE,
+        flush_interval=settings.ACCESS_LOG_FLUSH_INTERVAL_SECONDS,
+        queue_size=settings.ACCESS_LOG_QUEUE_SIZE,
+    )
+    app.add_middleware(
+        AccessLogMiddleware,
+        writer=access_log_writer,
+        sample_rates=parse_sample_rates(settings.ACCESS_LOG_SAMPLE_RATES),
+        slow_ms=settings.ACCESS_LOG_SLOW_MS,
+        prefix=settings.API_V1_PREFIX,
+    )
+
+traffic_capture_writer = None
+if settings.TRAFFIC_CAPTURE_PATH:
+    traffic_capture_writer = AsyncLogWriter(
+        settings.TRAFFIC_CAPTURE_PATH,
+        max_bytes=settings.ACCESS_LOG_MAX_BYTES,
+        backups=settings.ACCESS_LOG_BACKUPS,
+        batch_size=settings.ACCESS_LOG_BATCH_SIZE,
+        flush_interval=settings.ACCESS_LOG_FLUSH_INTERVAL_SECONDS,
+        queue_size=settings.ACCESS_LOG_QUEUE_SIZE,
+    )
+    app.add_middleware(
+        TrafficCaptureMiddleware,
+        writer=traffic_capture_writer,
+        sample_rate=settings.TRAFFIC_CAPTURE_SAMPLE_RATE,
+        prefix=settings.API_V1_PREFIX,
+    )
+
+# Added last so it is the outermost layer and also decorates responses produced by the middleware above (e.g. admission 503s).
 app.add_middleware(
     CORSMiddleware,
    allow_origins=settings.allowed_origins_list,
@@ -29,6 +115,49 @@ create_tables()
 app.include_router(auth.router, prefix=settings.API_V1_PREFIX)
 app.include_router(tasks.router, prefix=settings.API_V1_PREFIX)
 app.include_router(admin.router, prefix=settings.API_V1_PREFIX)
+app.include_router(batch.router, prefix=settings.API_V1_PREFIX)
+
+@app.on_event("startup")
+async def configure_threadpool():
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+
+@app.on_event("startup")
+def load_token_denylist():
+    db = SessionLocal()
+    try:
+        denylist.sync(db)
+    finally:
+        db.close()
+    denylist.start_sync(SessionLocal, settings.TOKEN_DENYLIST_SYNC_SECONDS)
+
+@app.on_event("startup")
+def load_label_index():
+    db = SessionLocal()
+    try:
+        label_index.load(db)
+    finally:
+        db.close()
+    label_index.start_refresh(SessionLocal, settings.LABEL_INDEX_REFRESH_SECONDS)
+
+@app.on_event("startup")
+def start_log_writers():
+    for writer in (access_log_writer, trace_writer, traffic_capture_writer):
+        if writer is not None:
+            writer.start()
+
+@app.on_event("startup")
+def start_task_history():
+    task_history.start(engine)
+
+@app.on_event("shutdown")
+def flush_task_history():
+    task_history.stop()
+
+@app.on_event("shutdown")
+def stop_log_writers():
+    for writer in (access_log_writer, trace_writer, traffic_capture_writer):
+        if writer is not None:
+            writer.stop()
 
 @app.exception_handler(RateLimitExceeded)
 async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
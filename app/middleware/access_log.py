@@ -0,0 +1,65 @@
+import random
+import time
+from typing import Dict
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.log_writer import AsyncLogWriter
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    # "GET /api/v1/tasks/{task_id}=0.1,GET /api/v1/auth/me=0.05"
+    rates = {}
+    for item in value.split(","):
+        route, _, rate = item.rpartition("=")
+        if route.strip():
+            rates[route.strip()] = float(rate)
+    return rates
+
+def route_template(scope: Scope, prefix: str) -> str:
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or scope["path"]
+    # Routes from included routers report their path without the include prefix.
+    if route is not None and scope["path"].startswith(prefix) and not template.startswith(prefix):
+        template = prefix + template
+    return template
+
+class AccessLogMiddleware:
+    def __init__(self, app: ASGIApp, writer: AsyncLogWriter, sample_rates: Dict[str, float], slow_ms: float, prefix: str = ""):
+        self.app = app
+        self.prefix = prefix
+        self.writer = writer
+        self.sample_rates = sample_rates
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            latency_ms = (time.perf_counter() - started) * 1000
+            template = route_template(scope, self.prefix)
+            key = f"{scope['method']} {template}"
+            rate = self.sample_rates.get(key, 1.0)
+            # Errors and slow requests are always kept, whatever the sample rate of their route.
+            if rate >= 1.0 or status_code >= 500 or latency_ms >= self.slow_ms or random.random() < rate:
+                state = scope.get("state") or {}
+                self.writer.write({
+                    "ts": time.time(),
+                    "method": scope["method"],
+                    "route": template,
+                    "path": scope["path"],
+                    "status": status_code,
+                    "latency_ms": round(latency_ms, 3),
+                    "user_id": state.get("user_id"),
+                    "client": scope["client"][0] if scope.get("client") else None,
+                    "sample_rate": rate,
+                })
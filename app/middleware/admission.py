@@ -0,0 +1,83 @@
+import asyncio
+import json
+from typing import Dict, Optional, Sequence
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+class AdmissionGate:
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(limit)
+        self.waiting = 0
+        self.active = 0
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        if self.semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self.semaphore.release()
+
+class AdmissionControlMiddleware:
+    # Caps concurrent requests per route class so slow classes (password hashing, admin scans)
+    # cannot take every worker thread; a full queue is answered with 503 straight away.
+    OVERLOADED = {"error": "Service overloaded", "detail": "Too many concurrent requests. Please retry shortly."}
+
+    def __init__(self, app: ASGIApp, prefix: str, limits: Dict[str, int], max_queue: int, queue_timeout: float, retry_after: int,
+                 batch_paths: Sequence[str] = ()):
+        self.app = app
+        self.prefix = prefix
+        self.gates = {name: AdmissionGate(limit, max_queue, queue_timeout) for name, limit in limits.items()}
+        self.retry_after = retry_after
+        self.batch_paths = set(batch_paths)
+
+    def route_class(self, scope: Scope) -> str:
+        path = scope["path"][len(self.prefix):]
+        if path.startswith("/auth"):
+            return "auth"
+        if path.startswith("/admin"):
+            return "admin"
+        if scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            return "reads"
+        return "writes"
+
+    async def admit(self, scope: Scope) -> Optional[AdmissionGate]:
+        # The gate now held for this request (release it when done), or None when the request is rejected.
+        gate = self.gates[self.route_class(scope)]
+        return gate if await gate.acquire() else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        if scope["path"].rstrip("/") in self.batch_paths:
+            # Admitted per operation by the batch route instead of as one request.
+            scope.setdefault("state", {})["admission"] = self
+            await self.app(scope, receive, send)
+            return
+        gate = await self.admit(scope)
+        if gate is None:
+            body = json.dumps(self.OVERLOADED).encode()
+            await send({"type": "http.response.start", "status": 503,
+                        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                                    (b"retry-after", str(self.retry_after).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
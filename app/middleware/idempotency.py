@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Dict, Iterable
+from anyio import to_thread
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.idempotency import IdempotencyStore
+from app.utils.security import verify_token
+
+# Answers that depend on state a retry can change (credentials, conflicts, rate limits) are not stored.
+UNSTORED_STATUSES = {401, 403, 409, 429}
+
+class IdempotencyMiddleware:
+    # POSTs to the given paths that carry an Idempotency-Key run once per caller and key; retries get the
+    # stored response back, and duplicates arriving while the first is still running wait for it.
+    def __init__(self, app: ASGIApp, store: IdempotencyStore, paths: Iterable[str], wait_seconds: float):
+        self.app = app
+        self.store = store
+        self.paths = {path.rstrip("/") for path in paths}
+        self.wait_seconds = wait_seconds
+        self._inflight: Dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"].rstrip("/") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+        if len(idempotency_key) > 255:
+            await self.respond(send, 400, "Idempotency-Key must be at most 255 characters")
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        fingerprint = hashlib.sha256(scope["path"].encode() + b"\n" + body).hexdigest()
+        key = f"{self.caller(headers)}:{scope['path'].rstrip('/')}:{idempotency_key}"
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            record = self.store.get_cached(key)
+            if record is None:
+                event = self._inflight.get(key)
+                if event is not None:
+                    try:
+                        await asyncio.wait_for(event.wait(), max(deadline - time.monotonic(), 0))
+                    except asyncio.TimeoutError:
+                        await self.respond(send, 409, "A request with this Idempotency-Key is still in progress")
+                        return
+                    continue
+                self._inflight[key] = event = asyncio.Event()
+                try:
+                    record = await to_thread.run_sync(self.store.claim, key, fingerprint)
+                    if record is None:
+                        await self.run_first(scope, receive, send, body, key, fingerprint)
+                        return
+                finally:
+                    del self._inflight[key]
+                    event.set()
+            if record["status"] is None:
+                # Claimed by another process; poll until it stores its response or gives the key up.
+                if time.monotonic() >= deadline:
+                    await self.respond(send, 409, "A request with this Idempotency-Key is still in progress")
+                    return
+                await asyncio.sleep(0.05)
+                continue
+            if record["fingerprint"] != fingerprint:
+                await self.respond(send, 422, "Idempotency-Key was already used with a different request")
+                return
+            self.store.replays += 1
+            await send({"type": "http.response.start", "status": record["status"],
+                        "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+                        + [(b"idempotent-replayed", b"true")]})
+            await send({"type": "http.response.body", "body": record["body"]})
+            return
+
+    async def run_first(self, scope: Scope, receive: Receive, send: Send, body: bytes, key: str, fingerprint: str) -> None:
+        pending = [{"type": "http.request", "body": body, "more_body": False}]
+        response = {"status": 500, "headers": [], "body": b""}
+
+        async def replay_receive() -> Message:
+            return pending.pop() if pending else await receive()
+
+        async def capture(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [[name.decode("latin-1"), value.decode("latin-1")] for name, value in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture)
+        except BaseException:
+            await to_thread.run_sync(self.store.release, key)
+            raise
+        if response["status"] >= 500 or response["status"] in UNSTORED_STATUSES:
+            # Not stored, so the client can retry with the same key.
+            await to_thread.run_sync(self.store.release, key)
+        else:
+            await to_thread.run_sync(self.store.complete, key, fingerprint, response["status"], response["headers"], response["body"])
+
+    def caller(self, headers: Headers) -> str:
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        payload = verify_token(token, token_type="access") if scheme.lower() == "bearer" and token else None
+        return f"user:{payload['sub']}" if payload else "anonymous"
+
+    async def respond(self, send: Send, status_code: int, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send({"type": "http.response.start", "status": status_code,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
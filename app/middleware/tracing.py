@@ -0,0 +1,35 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.middleware.access_log import route_template
+from app.utils.tracing import Tracer, current_span
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp, tracer: Tracer, prefix: str = ""):
+        self.app = app
+        self.tracer = tracer
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        root = self.tracer.start_trace(f"{scope['method']} {scope['path']}", Headers(scope=scope).get("traceparent"),
+                                       {"method": scope["method"], "path": scope["path"]})
+        token = current_span.set(root)
+        status_code = 500
+
+        async def send_with_context(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                flags = "01" if root.trace.sampled else "00"
+                MutableHeaders(scope=message)["traceparent"] = f"00-{root.trace.trace_id}-{root.span_id}-{flags}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_context)
+        finally:
+            current_span.reset(token)
+            root.attributes["route"] = route_template(scope, self.prefix)
+            root.attributes["user_id"] = (scope.get("state") or {}).get("user_id")
+            self.tracer.finish_trace(root, status_code)
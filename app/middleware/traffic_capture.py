@@ -0,0 +1,67 @@
+import json
+import random
+import time
+from urllib.parse import parse_qsl
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.middleware.access_log import route_template
+from app.utils.log_writer import AsyncLogWriter
+from app.utils.traffic import MAX_CAPTURED_BODY, sanitize
+
+class TrafficCaptureMiddleware:
+    # Opt-in recorder for app.utils.traffic's replayer: one JSONL line per request with the route,
+    # sanitized query and body shape, caller and timing. Credentials and free text are never written.
+    def __init__(self, app: ASGIApp, writer: AsyncLogWriter, sample_rate: float = 1.0, prefix: str = ""):
+        self.app = app
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix) or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+        ts = time.time()
+        started = time.perf_counter()
+        status_code = 500
+        chunks = []
+        size = 0
+
+        async def receive_and_keep() -> Message:
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request":
+                size += len(message.get("body", b""))
+                if size <= MAX_CAPTURED_BODY:
+                    chunks.append(message.get("body", b""))
+            return message
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_keep, send_with_status)
+        finally:
+            content_type = Headers(scope=scope).get("content-type", "")
+            body = None
+            if chunks and size <= MAX_CAPTURED_BODY and content_type.startswith("application/json"):
+                try:
+                    body = sanitize(json.loads(b"".join(chunks)))
+                except ValueError:
+                    body = None
+            self.writer.write({
+                "ts": ts,
+                "method": scope["method"],
+                "route": route_template(scope, self.prefix),
+                "path": scope["path"],
+                "query": [[key, sanitize(value, key)] for key, value in parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)],
+                "content_type": content_type,
+                "body": body,
+                "body_bytes": size,
+                "user_id": (scope.get("state") or {}).get("user_id"),
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            })
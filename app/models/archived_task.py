@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from datetime import datetime
+from app.database.database import Base
+from app.models.task import StatusType, PriorityType
+
+class ArchivedTask(Base):
+    # Completed tasks moved out of the hot tasks table by app.services.archival; same columns, same ids.
+    __tablename__ = "archived_tasks"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    status = Column(StatusType, default="completed")
+    priority = Column(PriorityType, default="medium")
+    due_date = Column(DateTime, nullable=True)
+    created_by = Column(Integer, nullable=False, index=True)
+    assigned_to = Column(Integer, nullable=True, index=True)
+    parent_id = Column(Integer, nullable=True)
+    path = Column(String, default="/", server_default="/", nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    version = Column(Integer, default=1, server_default="1", nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Index, Integer, String, DateTime, ForeignKey
+from datetime import datetime
+from app.database.database import Base
+
+class Label(Base):
+    __tablename__ = "labels"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class TaskLabel(Base):
+    __tablename__ = "task_labels"
+    __table_args__ = (
+        Index("ix_task_labels_label_id_task_id", "label_id", "task_id"),
+    )
+
+    # Primary key (task_id, label_id) serves "labels of a task", the index above "tasks with a label".
+    task_id = Column(Integer, primary_key=True)  # no foreign key: tasks may live in shards or the archive
+    label_id = Column(Integer, ForeignKey("labels.id"), primary_key=True)
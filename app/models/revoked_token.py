@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from datetime import datetime
+from app.database.database import Base
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    
+    jti = Column(String, primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
\ No newline at end of file
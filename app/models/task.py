@@ -1,21 +1,49 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import CheckConstraint, Column, Index, Integer, String, DateTime, ForeignKey, Text, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database.database import Base
+from app.database.types import CodedString
+
+TASK_STATUSES = ("pending", "in_progress", "completed")
+TASK_PRIORITIES = ("low", "medium", "high")
+StatusType = CodedString(TASK_STATUSES)
+PriorityType = CodedString(TASK_PRIORITIES)
+# Written with a literal code rather than a bound parameter so SQLite can match queries against the partial indexes below.
+OPEN_TASK_SQL = f"status != {TASK_STATUSES.index('completed')}"
+OPEN_WITH_DUE_DATE = text(f"{OPEN_TASK_SQL} AND due_date IS NOT NULL")
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        CheckConstraint(StatusType.check_expression("status"), name="ck_tasks_status"),
+        CheckConstraint(PriorityType.check_expression("priority"), name="ck_tasks_priority"),
+        Index("ix_tasks_status_priority", "status", "priority"),
+        Index("ix_tasks_path", "path"),
+        Index("ix_tasks_created_by_status_priority", "created_by", "status", "priority"),
+        Index("ix_tasks_assigned_to_status_priority", "assigned_to", "status", "priority"),
+        Index("ix_tasks_open_due", "due_date", sqlite_where=OPEN_WITH_DUE_DATE, postgresql_where=OPEN_WITH_DUE_DATE),
+        Index("ix_tasks_open_due_creator", "created_by", "due_date", sqlite_where=OPEN_WITH_DUE_DATE, postgresql_where=OPEN_WITH_DUE_DATE),
+        Index("ix_tasks_open_due_assignee", "assigned_to", "due_date", sqlite_where=OPEN_WITH_DUE_DATE, postgresql_where=OPEN_WITH_DUE_DATE),
+        {"sqlite_autoincrement": True},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    status = Column(String, default="pending")
-    priority = Column(String, default="medium")
+    status = Column(StatusType, default="pending")
+    priority = Column(PriorityType, default="medium")
     due_date = Column(DateTime, nullable=True)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("tasks.id"), nullable=True, index=True)
+    # Ancestor ids, root first: "/" for a top-level task, "/1/5/" for a child of 5 under 1.
+    path = Column(String, default="/", server_default="/", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped by every update; ORM flushes and the RETURNING update path only write when it still matches.
+    version = Column(Integer, default=1, server_default="1", nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
     
     creator = relationship("User", back_populates="created_tasks", foreign_keys=[created_by])
     assignee = relationship("User", back_populates="assigned_tasks", foreign_keys=[assigned_to])
\ No newline at end of file
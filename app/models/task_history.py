@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Index, Integer, String, DateTime
+from datetime import datetime
+from app.database.database import Base
+
+class TaskHistory(Base):
+    __tablename__ = "task_history"
+    __table_args__ = (
+        Index("ix_task_history_task_id_id", "task_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False)  # no foreign key: history outlives the task and tasks may live in shards
+    changed_by = Column(Integer, nullable=True)
+    action = Column(String, nullable=False)
+    field = Column(String, nullable=True)
+    old_value = Column(String, nullable=True)
+    new_value = Column(String, nullable=True)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -12,6 +12,7 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     password = Column(String, nullable=False)
     role = Column(String, default="user", nullable=False)  # "user" or "admin"
+    token_epoch = Column(Integer, default=0, server_default="0", nullable=False)  # bumped to revoke every issued token
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -1,36 +1,150 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, case, func, literal, update
 from sqlalchemy.orm import Session
-from typing import List
-from app.database.database import get_db
-from app.schemas.user import UserResponse, RoleUpdate
+from typing import Dict, List, Optional
+from app.database.database import engine, get_db, supports_returning
+from app.database.sharding import merge_counts
+from app.schemas.user import UserResponse, UserWithTaskCounts, UserPage, RoleUpdate, ProvisioningResult
 from app.models.user import User
+from app.models.task import Task
+from app.config import settings
 from app.middleware.auth import get_current_user
 from app.middleware.authorization import is_admin
+from app.utils.pagination import encode_cursor, decode_cursor, prefix_upper_bound
+from app.services.task_cache import statistics_flight, task_list_cache, task_list_flight
+from app.utils.tracing import tracer
+from app.services.archival import archive_completed_tasks
+from app.services.user_service import parse_user_rows, provision_users, purge_user, purge_user_in_background
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
-@router.get("/users", response_model=List[UserResponse])
-def get_all_users(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def task_counts_by_user(db: Session, user_ids: List[int]) -> Dict[int, dict]:
+    if not user_ids:
+        return {}
+    not_completed = Task.status != "completed"
+    created = db.query(Task.created_by.label("user_id"), literal(1).label("created"), literal(0).label("assigned"),
+                       case((not_completed, 1), else_=0).label("open")).filter(Task.created_by.in_(user_ids))
+    # A task a user both created and is assigned to is only counted once as open.
+    assigned = db.query(Task.assigned_to.label("user_id"), literal(0).label("created"), literal(1).label("assigned"),
+                        case((and_(not_completed, Task.created_by != Task.assigned_to), 1), else_=0).label("open")
+                        ).filter(Task.assigned_to.in_(user_ids))
+    rows = created.union_all(assigned).subquery()
+    grouped = db.query(rows.c.user_id, func.sum(rows.c.created), func.sum(rows.c.assigned), func.sum(rows.c.open)
+                       ).group_by(rows.c.user_id)
+    counts: Dict[int, dict] = {}
+    for user_id, created_count, assigned_count, open_count in grouped:
+        # With sharded tasks each shard contributes its own partial group per user.
+        entry = counts.setdefault(user_id, {"created_task_count": 0, "assigned_task_count": 0, "open_task_count": 0})
+        entry["created_task_count"] += created_count
+        entry["assigned_task_count"] += assigned_count
+        entry["open_task_count"] += open_count
+    return counts
+
+@router.get("/users", response_model=UserPage)
+def get_all_users(cursor: Optional[str] = None, limit: int = Query(50, ge=1, le=200), email_prefix: Optional[str] = None,
+                  include_task_counts: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
-    return db.query(User).all()
+    after = decode_cursor(cursor)
+    query = db.query(User)
+    if email_prefix:
+        # Range predicate instead of LIKE so the unique index on users.email serves both filter and order.
+        query = query.filter(User.email >= email_prefix)
+        upper = prefix_upper_bound(email_prefix)
+        if upper is not None:
+            query = query.filter(User.email < upper)
+        if after is not None:
+            query = query.filter(User.email > str(after))
+        query = query.order_by(User.email)
+    else:
+        if after is not None:
+            if not isinstance(after, int):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            query = query.filter(User.id > after)
+        query = query.order_by(User.id)
+    users = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1].email if email_prefix else users[-1].id)
+    items = [UserWithTaskCounts.model_validate(user) for user in users]
+    if include_task_counts:
+        zero = {"created_task_count": 0, "assigned_task_count": 0, "open_task_count": 0}
+        counts = task_counts_by_user(db, [user.id for user in users])
+        items = [item.model_copy(update=counts.get(item.id, zero)) for item in items]
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/cache/stats")
+def get_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return {"task_list": task_list_cache.stats(),
+            "single_flight": {"task_list": task_list_flight.stats(), "statistics": statistics_flight.stats()}}
+
+@router.get("/traces")
+def get_traces(route: Optional[str] = None, min_duration_ms: float = 0, limit: int = Query(50, ge=1, le=500),
+               current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return tracer.find(route=route, min_duration_ms=min_duration_ms, limit=limit)
+
+@router.get("/traces/{trace_id}")
+def get_trace(trace_id: str, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found")
+    return trace
+
+@router.post("/tasks/archive", status_code=status.HTTP_202_ACCEPTED)
+def archive_tasks(background_tasks: BackgroundTasks, older_than_days: int = Query(settings.ARCHIVE_AFTER_DAYS, ge=0),
+                  current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    background_tasks.add_task(archive_completed_tasks, engine, older_than_days, settings.ARCHIVE_CHUNK_SIZE)
+    return Response(status_code=status.HTTP_202_ACCEPTED)
+
+@router.post("/users/import", response_model=ProvisioningResult)
+async def import_users(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    content_type = request.headers.get("content-type", "")
+    if "csv" not in content_type and "ndjson" not in content_type:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Send text/csv or application/x-ndjson")
+    rows = parse_user_rows(content_type, await request.body())
+    if len(rows) > settings.PROVISIONING_MAX_ROWS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"At most {settings.PROVISIONING_MAX_ROWS} users per import")
+    return await run_in_threadpool(provision_users, db, rows)
 
 @router.put("/users/{user_id}/role", response_model=UserResponse)
 def update_user_role(user_id: int, role_data: RoleUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    if supports_returning(db):
+        if user_id == current_user.id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot change your own role")
+        row = db.execute(update(User).where(User.id == user_id).values(role=role_data.role, token_epoch=User.token_epoch + 1).returning(*User.__table__.c),
+                         execution_options={"synchronize_session": False}).mappings().first()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        db.commit()
+        return dict(row)
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     if user.id == current_user.id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot change your own role")
     user.role = role_data.role
+    user.token_epoch = User.token_epoch + 1
     db.commit()
     db.refresh(user)
     return user
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def delete_user(user_id: int, background_tasks: BackgroundTasks, owned_tasks: Optional[str] = Query(None, pattern="^(delete|reassign)$"),
+                reassign_to: Optional[int] = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     user = db.query(User).filter(User.id == user_id).first()
@@ -38,6 +152,17 @@ def delete_user(user_id: int, db: Session = Depends(get_db), current_user: User
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     if user.id == current_user.id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete yourself")
-    db.delete(user)
-    db.commit()
+    if owned_tasks == "reassign":
+        if reassign_to is None or reassign_to == user.id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="reassign_to must be another user")
+        if db.query(User.id).filter(User.id == reassign_to).first() is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reassignment target not found")
+    owned, assigned = merge_counts(db.query(func.count(case((Task.created_by == user.id, 1))), func.count(case((Task.assigned_to == user.id, 1)))
+                                            ).filter((Task.created_by == user.id) | (Task.assigned_to == user.id)).all())
+    if owned and owned_tasks is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User owns tasks; pass owned_tasks=delete or owned_tasks=reassign")
+    if owned + assigned > settings.USER_DELETE_BACKGROUND_THRESHOLD:
+        background_tasks.add_task(purge_user_in_background, user.id, owned_tasks, reassign_to, current_user.id)
+        return Response(status_code=status.HTTP_202_ACCEPTED)
+    purge_user(db, user.id, owned_tasks, reassign_to, changed_by=current_user.id)
     return None
\ No newline at end of file
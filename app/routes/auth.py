@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from typing import Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.database.database import get_db
+from app.database.database import get_db, supports_returning
 from app.schemas.user import UserCreate, UserResponse, UserLogin
-from app.schemas.auth import Token, RefreshTokenRequest
+from app.schemas.auth import Token, RefreshTokenRequest, LogoutRequest
 from app.models.user import User
 from app.utils.security import hash_password, verify_password, create_access_token, create_refresh_token, verify_token
 from app.utils.validators import validate_email, validate_password
 from app.middleware.auth import get_current_user
+from app.utils.revocation import denylist
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -15,42 +19,63 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     if not validate_email(user_data.email):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid email")
     validate_password(user_data.password)
+    values = dict(name=user_data.name, email=user_data.email, password=hash_password(user_data.password), role=user_data.role or "user")
+    if supports_returning(db):
+        # The unique index on users.email replaces the duplicate-email SELECT.
+        try:
+            row = db.execute(insert(User).values(**values).returning(*User.__table__.c)).mappings().one()
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+        return dict(row)
     existing_user = db.query(User).filter(User.email == user_data.email).first()
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-    hashed_password = hash_password(user_data.password)
-    new_user = User(name=user_data.name, email=user_data.email, password=hashed_password, role=user_data.role or "user")
+    new_user = User(**values)
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
     return new_user
 
+def issue_tokens(user: User) -> dict:
+    access_token = create_access_token(data={"sub": str(user.id), "email": user.email, "role": user.role, "epoch": user.token_epoch})
+    refresh_token = create_refresh_token(data={"sub": str(user.id), "epoch": user.token_epoch})
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer", "user": user}
+
 @router.post("/login", response_model=Token)
 def login(credentials: UserLogin, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == credentials.email).first()
     if not user or not verify_password(credentials.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    access_token = create_access_token(data={"sub": str(user.id), "email": user.email, "role": user.role})
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
-    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer", "user": user}
+    return issue_tokens(user)
 
 @router.get("/me", response_model=UserResponse)
 def get_current_user_profile(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.post("/logout")
-def logout(current_user: User = Depends(get_current_user)):
+def logout(request: Request, body: Optional[LogoutRequest] = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    payload = getattr(request.state, "token_payload", None)
+    if payload:
+        denylist.revoke(db, payload.get("jti"), payload["exp"])
+    if body and body.refresh_token:
+        refresh_payload = verify_token(body.refresh_token, token_type="refresh")
+        if refresh_payload and refresh_payload.get("sub") == str(current_user.id):
+            denylist.revoke(db, refresh_payload.get("jti"), refresh_payload["exp"])
     return {"message": "Successfully logged out"}
 
 @router.post("/refresh", response_model=Token)
 def refresh_access_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
     payload = verify_token(request.refresh_token, token_type="refresh")
-    if payload is None:
+    if payload is None or denylist.is_revoked(payload.get("jti")):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
     user_id = payload.get("sub")
     user = db.query(User).filter(User.id == int(user_id)).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    access_token = create_access_token(data={"sub": str(user.id), "email": user.email, "role": user.role})
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
-    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer", "user": user}
\ No newline at end of file
+    if payload.get("epoch", 0) != user.token_epoch:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    # Refresh tokens are single use: the presented one is revoked as the new pair is issued.
+    denylist.revoke(db, payload.get("jti"), payload["exp"])
+    return issue_tokens(user)
\ No newline at end of file
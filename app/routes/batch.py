@@ -0,0 +1,78 @@
+import json
+from urllib.parse import urlsplit
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database.database import get_db
+from app.schemas.batch import BatchOperation, BatchRequest, BatchResponse
+from app.models.user import User
+from app.middleware.auth import get_current_user
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+
+async def run_operation(request: Request, operation: BatchOperation, db: Session, current_user: User) -> dict:
+    target = urlsplit(operation.path)
+    path = settings.API_V1_PREFIX + target.path
+    if target.path == router.prefix or target.path.startswith(router.prefix + "/"):
+        return {"status": status.HTTP_400_BAD_REQUEST, "body": {"detail": "Nested batch requests are not allowed"}}
+    body = b"" if operation.body is None else json.dumps(operation.body).encode()
+    headers = [(key, value) for key, value in request.scope["headers"] if key in (b"authorization", b"accept", b"user-agent")]
+    headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    # The sub-request reuses the caller's resolved user, token and session; get_current_user and get_db pick them up from
+    # state, and the token payload lets /auth/logout revoke the caller's access token from inside a batch.
+    scope = {**request.scope, "method": operation.method, "path": path, "raw_path": path.encode(),
+             "query_string": target.query.encode(), "headers": headers,
+             "state": {"batch_db": db, "batch_user": current_user, "token_payload": getattr(request.state, "token_payload", None)}}
+    scope.pop("route", None)
+    scope.pop("endpoint", None)
+    scope.pop("path_params", None)
+    pending = [{"type": "http.request", "body": body, "more_body": False}]
+    response = {"status": 500, "content_type": "", "body": b""}
+
+    async def receive():
+        return pending.pop() if pending else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["content_type"] = dict(message.get("headers", [])).get(b"content-type", b"").decode()
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    # Each operation is charged to its own route class, as it would be if sent on its own.
+    admission = getattr(request.state, "admission", None)
+    gate = None
+    if admission is not None:
+        gate = await admission.admit(scope)
+        if gate is None:
+            return {"status": status.HTTP_503_SERVICE_UNAVAILABLE, "body": admission.OVERLOADED}
+    try:
+        await request.app.router(scope, receive, send)
+    except StarletteHTTPException as exc:
+        # Raised by the router itself (unknown path, wrong method) rather than by a route.
+        return {"status": exc.status_code, "body": {"detail": exc.detail}}
+    except Exception as exc:
+        db.rollback()
+        return {"status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                "body": {"error": "Internal server error", "detail": str(exc) if settings.DEBUG else "An unexpected error occurred"}}
+    finally:
+        if gate is not None:
+            gate.release()
+    # Writes share the batch session, so nothing a failed operation left pending may reach the next one.
+    if response["status"] >= 400:
+        db.rollback()
+    result = None
+    if response["body"]:
+        if response["content_type"].startswith("application/json"):
+            result = json.loads(response["body"])
+        else:
+            result = response["body"].decode(errors="replace")
+    return {"status": response["status"], "body": result}
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(batch: BatchRequest, request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if len(batch.operations) > settings.BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {settings.BATCH_MAX_OPERATIONS} operations per batch")
+    results = [await run_operation(request, operation, db, current_user) for operation in batch.operations]
+    return {"results": results}
@@ -1,67 +1,339 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, insert, literal, select, text, union, union_all, update
+from sqlalchemy.orm import Session, aliased, load_only
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from typing import List, Optional
-from app.database.database import get_db
-from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse, TaskStatistics
-from app.models.task import Task
+from app.config import settings
+from app.database.database import get_db, is_sharded, supports_returning
+from app.database.sharding import merge_counts, sort_merged
+from app.schemas.task import (TaskCreate, TaskUpdate, TaskResponse, TaskStatistics, TaskStatus, TaskPriority, TaskMove, TaskRollup, TaskLabels, TaskLabelsResponse,
+                              TaskHistoryPage)
+from app.models.task import OPEN_TASK_SQL, Task
+from app.models.task_history import TaskHistory
+from app.models.archived_task import ArchivedTask
+from app.models.label import Label, TaskLabel
 from app.models.user import User
 from app.middleware.auth import get_current_user
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.validators import validate_fields
+from app.utils.tracing import span
+from app.utils.label_index import LabelMatch, label_index
+from app.services.task_cache import (task_list_cache, task_list_key, invalidate_task_lists, invalidate_all_task_lists, task_list_flight,
+                                     statistics_flight)
+from app.services.task_history import TRACKED_FIELDS, task_history
+from app.services.task_visibility import visible_task_ids
+from app.services.task_tree import children_path, get_visible_task, in_subtree, lift_children, move_subtree, visible_to
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
+TASK_RESPONSE_FIELDS = list(TaskResponse.model_fields)
 
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
-def create_task(task_data: TaskCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    new_task = Task(title=task_data.title, description=task_data.description, status=task_data.status, 
-                    priority=task_data.priority, due_date=task_data.due_date, created_by=current_user.id, 
-                    assigned_to=task_data.assigned_to)
+def create_task(task_data: TaskCreate, response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    values = dict(title=task_data.title, description=task_data.description, status=task_data.status,
+                  priority=task_data.priority, due_date=task_data.due_date, created_by=current_user.id,
+                  assigned_to=task_data.assigned_to)
+    if task_data.parent_id is not None:
+        parent = get_visible_task(db, task_data.parent_id, current_user, "Parent task not found")
+        values.update(parent_id=parent.id, path=children_path(parent))
+    if supports_returning(db):
+        row = db.execute(insert(Task).values(**values).returning(*Task.__table__.c)).mappings().one()
+        db.commit()
+        invalidate_task_lists(current_user.id, task_data.assigned_to)
+        task_history.record(row["id"], current_user.id, "created")
+        response.headers["ETag"] = etag(row["version"])
+        return dict(row)
+    new_task = Task(**values)
     db.add(new_task)
     db.commit()
     db.refresh(new_task)
+    invalidate_task_lists(current_user.id, task_data.assigned_to)
+    task_history.record(new_task.id, current_user.id, "created")
+    response.headers["ETag"] = etag(new_task.version)
     return new_task
 
-@router.get("/", response_model=List[TaskResponse])
-def get_all_tasks(status: Optional[str] = None, priority: Optional[str] = None, search: Optional[str] = None, 
-                  db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    query = db.query(Task)
-    if current_user.role != "admin":
-        query = query.filter((Task.created_by == current_user.id) | (Task.assigned_to == current_user.id))
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+def parse_if_match(value: Optional[str]) -> Optional[int]:
+    # The version a conditional write expects; None when the header is absent or "*".
+    if value is None or value.strip() == "*":
+        return None
+    try:
+        return int(value.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid If-Match header")
+
+def version_conflict(version: int) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Task was modified by another request",
+                         headers={"ETag": etag(version)})
+
+def sparse_response(tasks, fields: List[str]) -> JSONResponse:
+    if isinstance(tasks, list):
+        return JSONResponse(content=jsonable_encoder([{field: getattr(task, field) for field in fields} for task in tasks]))
+    return JSONResponse(content=jsonable_encoder({field: getattr(tasks, field) for field in fields}))
+
+def label_names(value) -> tuple:
+    # Label names from a comma separated query parameter or a request body list, trimmed and de-duplicated.
+    names = value.split(",") if isinstance(value, str) else value or ()
+    names = tuple(dict.fromkeys(name.strip() for name in names if name.strip()))
+    if any(len(name) > 50 for name in names):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Label names are limited to 50 characters")
+    return names
+
+def task_list_rows(db: Session, model, current_user: User, columns: List[str], status, priority, search, sort, ids: Optional[List[int]] = None) -> list:
+    # Plain column tuples: no ORM instances, identity map entries or per-row validation.
+    statement = select(*[getattr(model, column) for column in columns])
+    criteria = []
+    if ids is not None:
+        criteria.append(model.id.in_(ids))
     if status:
-        query = query.filter(Task.status == status)
+        criteria.append(model.status == status)
     if priority:
-        query = query.filter(Task.priority == priority)
+        criteria.append(model.priority == priority)
+    if current_user.role != "admin":
+        statement = statement.where(model.id.in_(visible_task_ids(model, current_user.id, *criteria)))
+    elif criteria:
+        statement = statement.where(*criteria)
     if search:
-        query = query.filter(Task.title.ilike(f"%{search}%"))
-    return query.all()
+        statement = statement.where(model.title.ilike(f"%{search}%"))
+    if sort:
+        column = getattr(model, sort.lstrip("-"))
+        statement = statement.order_by(column.desc() if sort.startswith("-") else column, model.id)
+    return db.execute(statement).all()
+
+@router.get("/", response_model=List[TaskResponse])
+def get_all_tasks(status: Optional[TaskStatus] = None, priority: Optional[TaskPriority] = None, search: Optional[str] = None,
+                  fields: Optional[str] = None, sort: Optional[str] = Query(None, pattern="^-?(priority|status|due_date|created_at)$"),
+                  include_archived: bool = False, labels: Optional[str] = None, any_labels: Optional[str] = None,
+                  exclude_labels: Optional[str] = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    selected = validate_fields(fields, TaskResponse)
+    label_filter = (label_names(labels), label_names(any_labels), label_names(exclude_labels))
+    key = task_list_key(current_user, status, priority, search, tuple(selected or ()), sort, include_archived, label_filter)
+    body = task_list_cache.get(key)
+    if body is None:
+        body = task_list_flight.do(key, lambda: build_task_list(db, current_user, key, selected, status, priority, search, sort, include_archived,
+                                                                label_index.match(*label_filter) if any(label_filter) else None))
+    return Response(content=body, media_type="application/json")
+
+def build_task_list(db: Session, current_user: User, key: tuple, selected, status, priority, search, sort, include_archived: bool,
+                    labels: Optional[LabelMatch] = None) -> bytes:
+    fields = selected or TASK_RESPONSE_FIELDS
+    # id and the sort column are needed to merge shard and archive results; they trail the output columns.
+    columns = list(dict.fromkeys([*fields, "id", *([sort.lstrip("-")] if sort else [])]))
+    # Small label matches narrow the query itself; larger ones and exclusion-only filters are checked per row.
+    ids = labels.candidate_ids(settings.LABEL_FILTER_MAX_IDS) if labels is not None else None
+    rows = task_list_rows(db, Task, current_user, columns, status, priority, search, sort, ids) if ids != [] else []
+    if include_archived and status in (None, "completed") and ids != []:
+        rows += task_list_rows(db, ArchivedTask, current_user, columns, status, priority, search, sort, ids)
+    if labels is not None and ids is None:
+        rows = [row for row in rows if labels.allows(row.id)]
+    if sort and (is_sharded(db) or include_archived):
+        rows = sort_merged(rows, sort.lstrip("-"), sort.startswith("-"))
+    with span("serialize", rows=len(rows)):
+        width = len(fields)
+        # Same JSON as validating through TaskResponse: the columns already have the response types.
+        body = JSONResponse(content=[dict(zip(fields, [value.isoformat() if isinstance(value, datetime) else value for value in row[:width]]))
+                                     for row in rows]).body
+    task_list_cache.set(key, body)
+    return body
 
 @router.get("/statistics", response_model=TaskStatistics)
 def get_task_statistics(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    query = db.query(Task)
-    if current_user.role != "admin":
-        query = query.filter((Task.created_by == current_user.id) | (Task.assigned_to == current_user.id))
-    return {
-        "total_tasks": query.count(),
-        "completed_tasks": query.filter(Task.status == "completed").count(),
-        "pending_tasks": query.filter(Task.status == "pending").count(),
-        "in_progress_tasks": query.filter(Task.status == "in_progress").count(),
-        "high_priority": query.filter(Task.priority == "high").count(),
-        "medium_priority": query.filter(Task.priority == "medium").count(),
-        "low_priority": query.filter(Task.priority == "low").count()
-    }
+    # Keyed by the caller's cache generation, so a read after a write never joins a flight that started before it.
+    return statistics_flight.do(task_list_key(current_user), lambda: task_statistics(db, current_user))
+
+def task_statistics(db: Session, current_user: User) -> dict:
+    if current_user.role == "admin":
+        rows = select(Task.status, Task.priority).subquery()
+    else:
+        # Both branches are answered from the (created_by|assigned_to, status, priority) indexes; the
+        # second skips the user's own tasks so nothing is counted twice.
+        rows = union_all(select(Task.status, Task.priority).where(Task.created_by == current_user.id),
+                         select(Task.status, Task.priority).where(Task.assigned_to == current_user.id, Task.created_by != current_user.id)).subquery()
+    counts = db.query(
+        func.count(),
+        *[func.count(case((rows.c.status == value, 1))) for value in ("completed", "pending", "in_progress")],
+        *[func.count(case((rows.c.priority == value, 1))) for value in ("high", "medium", "low")],
+    ).select_from(rows).all()
+    counts = merge_counts(counts)
+    keys = ("total_tasks", "completed_tasks", "pending_tasks", "in_progress_tasks", "high_priority", "medium_priority", "low_priority")
+    return dict(zip(keys, counts))
+
+def open_tasks_due(db: Session, current_user: User, start: Optional[datetime], end: datetime, limit: int) -> list:
+    # Each branch is a bounded range scan over one of the ix_tasks_open_due* partial indexes, already in
+    # due-date order; a creator/assignee OR would not be able to use them.
+    def due(*criteria):
+        window = [text(OPEN_TASK_SQL), Task.due_date < end, *criteria]
+        if start is not None:
+            window.append(Task.due_date >= start)
+        return select(Task).where(*window).order_by(Task.due_date).limit(limit)
+    if current_user.role == "admin":
+        statement = due()
+    else:
+        branches = union(*[due(criterion).subquery().select() for criterion in (Task.created_by == current_user.id, Task.assigned_to == current_user.id)])
+        due_task = aliased(Task, branches.subquery())
+        statement = select(due_task).order_by(due_task.due_date, due_task.id).limit(limit)
+    tasks = list(db.execute(statement).scalars())
+    if is_sharded(db):
+        tasks = sort_merged(tasks, "due_date")[:limit]
+    return tasks
+
+@router.get("/overdue", response_model=List[TaskResponse])
+def get_overdue_tasks(limit: int = Query(50, ge=1, le=200), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return open_tasks_due(db, current_user, None, datetime.utcnow(), limit)
+
+@router.get("/upcoming", response_model=List[TaskResponse])
+def get_upcoming_tasks(days: int = Query(7, ge=1, le=365), limit: int = Query(50, ge=1, le=200),
+                       db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    now = datetime.utcnow()
+    return open_tasks_due(db, current_user, now, now + timedelta(days=days), limit)
 
 @router.get("/{task_id}", response_model=TaskResponse)
-def get_task(task_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    task = db.query(Task).filter(Task.id == task_id).first()
+def get_task(task_id: int, response: Response, fields: Optional[str] = None, include_archived: bool = False, db: Session = Depends(get_db),
+             current_user: User = Depends(get_current_user)):
+    selected = validate_fields(fields, TaskResponse)
+    # created_by/assigned_to are always loaded for the permission check below, version for the ETag.
+    columns = set(selected or ()) | {"created_by", "assigned_to", "version"}
+    task = None
+    for model in (Task, ArchivedTask) if include_archived else (Task,):
+        query = db.query(model).filter(model.id == task_id)
+        if selected:
+            query = query.options(load_only(*[getattr(model, field) for field in columns]))
+        task = query.first()
+        if task:
+            break
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     if current_user.role != "admin" and task.created_by != current_user.id and task.assigned_to != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    if selected:
+        sparse = sparse_response(task, selected)
+        sparse.headers["ETag"] = etag(task.version)
+        return sparse
+    response.headers["ETag"] = etag(task.version)
     return task
 
+@router.get("/{task_id}/subtasks", response_model=List[TaskResponse])
+def get_subtasks(task_id: int, direct: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    task = get_visible_task(db, task_id, current_user)
+    query = db.query(Task).filter(Task.parent_id == task.id if direct else in_subtree(task))
+    visible = visible_to(current_user)
+    if visible is not None:
+        query = query.filter(visible)
+    tasks = query.order_by(Task.path, Task.id).all()
+    if is_sharded(db):
+        tasks = sort_merged(tasks, "path")
+    return tasks
+
+@router.get("/{task_id}/rollup", response_model=TaskRollup)
+def get_task_rollup(task_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    task = get_visible_task(db, task_id, current_user)
+    query = db.query(func.count(Task.id), func.count(case((Task.status == "completed", 1)))).filter((Task.id == task.id) | in_subtree(task))
+    visible = visible_to(current_user)
+    if visible is not None:
+        query = query.filter(visible)
+    total, completed = merge_counts(query.all())
+    return {"task_id": task.id, "total_tasks": total, "completed_tasks": completed,
+            "completion_percentage": round(completed * 100 / total, 2) if total else 0.0}
+
+@router.get("/{task_id}/history", response_model=TaskHistoryPage)
+def get_task_history(task_id: int, cursor: Optional[str] = None, limit: int = Query(50, ge=1, le=200),
+                     db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    task = db.query(Task.created_by, Task.assigned_to).filter(Task.id == task_id).first()
+    # Admins can still read the history of a deleted task.
+    if task is None and current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    if task is not None and current_user.role != "admin" and current_user.id not in (task.created_by, task.assigned_to):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    after = decode_cursor(cursor)
+    query = db.query(TaskHistory).filter(TaskHistory.task_id == task_id)
+    if after is not None:
+        if not isinstance(after, int):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.filter(TaskHistory.id < after)
+    entries = query.order_by(TaskHistory.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor(entries[-1].id)
+    return {"items": entries, "next_cursor": next_cursor}
+
+@router.get("/{task_id}/labels", response_model=TaskLabelsResponse)
+def get_task_labels(task_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    task = get_visible_task(db, task_id, current_user)
+    return {"task_id": task.id, "labels": current_labels(db, task.id)}
+
+def current_labels(db: Session, task_id: int) -> List[str]:
+    return list(db.scalars(select(Label.name).join(TaskLabel, TaskLabel.label_id == Label.id).where(TaskLabel.task_id == task_id).order_by(Label.name)))
+
+def label_ids(db: Session, names: tuple) -> List[int]:
+    existing = dict(db.execute(select(Label.name, Label.id).where(Label.name.in_(names))).all())
+    missing = [name for name in names if name not in existing]
+    if missing:
+        db.add_all([Label(name=name) for name in missing])
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another request created one of them first.
+            db.rollback()
+        existing = dict(db.execute(select(Label.name, Label.id).where(Label.name.in_(names))).all())
+    return [existing[name] for name in names]
+
+@router.put("/{task_id}/labels", response_model=TaskLabelsResponse)
+def set_task_labels(task_id: int, task_labels: TaskLabels, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    task = get_visible_task(db, task_id, current_user)
+    if task.created_by != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    names = label_names(task_labels.labels)
+    previous = current_labels(db, task.id)
+    ids = label_ids(db, names) if names else []
+    db.query(TaskLabel).filter(TaskLabel.task_id == task.id).delete(synchronize_session=False)
+    db.add_all([TaskLabel(task_id=task.id, label_id=label_id) for label_id in ids])
+    db.commit()
+    label_index.set_task_labels(task.id, names)
+    invalidate_task_lists(task.created_by, task.assigned_to)
+    if sorted(names) != previous:
+        task_history.record(task.id, current_user.id, "labeled", "labels", ",".join(previous), ",".join(sorted(names)))
+    return {"task_id": task.id, "labels": sorted(names)}
+
+@router.put("/{task_id}/parent", response_model=TaskResponse)
+def move_task(task_id: int, move: TaskMove, response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    task = get_visible_task(db, task_id, current_user)
+    if task.created_by != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    parent = None
+    if move.parent_id is not None:
+        parent = get_visible_task(db, move.parent_id, current_user, "Parent task not found")
+        if parent.id == task.id or parent.path.startswith(children_path(task)):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot move a task under itself or its subtasks")
+    move_subtree(db, task, parent)
+    db.commit()
+    invalidate_all_task_lists()
+    new_parent_id = parent.id if parent is not None else None
+    if new_parent_id != task.parent_id:
+        task_history.record(task.id, current_user.id, "moved", "parent_id", task.parent_id, new_parent_id)
+    moved = db.query(Task).filter(Task.id == task.id).populate_existing().one()
+    response.headers["ETag"] = etag(moved.version)
+    return moved
+
 @router.put("/{task_id}", response_model=TaskResponse)
-def update_task(task_id: int, task_data: TaskUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def update_task(task_id: int, task_data: TaskUpdate, response: Response, if_match: Optional[str] = Header(None),
+                db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    update_data = task_data.model_dump(exclude_unset=True)
+    expected_version = parse_if_match(if_match)
+    if update_data and supports_returning(db):
+        row = update_task_returning(task_id, task_data, update_data, expected_version, db, current_user)
+        response.headers["ETag"] = etag(row["version"])
+        return row
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    previous_assignee = task.assigned_to
+    before = {field: getattr(task, field) for field in TRACKED_FIELDS}
     is_creator = task.created_by == current_user.id
     is_assignee = task.assigned_to == current_user.id
     is_admin = current_user.role == "admin"
@@ -71,22 +343,100 @@ def update_task(task_id: int, task_data: TaskUpdate, db: Session = Depends(get_d
         else:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Assignee can only update status")
     elif is_creator or is_admin:
-        update_data = task_data.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(task, field, value)
     else:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
-    db.commit()
+    if expected_version is not None and task.version != expected_version:
+        raise version_conflict(task.version)
+    try:
+        # The mapper's version_id_col makes the flush "UPDATE ... WHERE id = ? AND version = ?".
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise version_conflict(db.query(Task.version).filter(Task.id == task_id).scalar() or 0)
     db.refresh(task)
+    invalidate_task_lists(task.created_by, task.assigned_to, previous_assignee)
+    task_history.record_changes(task.id, current_user.id, before, {field: getattr(task, field) for field in TRACKED_FIELDS})
+    response.headers["ETag"] = etag(task.version)
     return task
 
+def update_task_returning(task_id: int, task_data: TaskUpdate, update_data: dict, expected_version: Optional[int], db: Session,
+                          current_user: User):
+    # Same rules as the fallback path, evaluated by the database: admins and creators may set every
+    # field, assignees only the status; any other caller matches no row. With If-Match, so does a
+    # row whose version has moved on.
+    statement = update(Task).where(Task.id == task_id)
+    if expected_version is not None:
+        statement = statement.where(Task.version == expected_version)
+    if current_user.role == "admin":
+        values = dict(update_data)
+    else:
+        is_creator = Task.created_by == current_user.id
+        values = {field: case((is_creator, literal(value, getattr(Task, field).type)), else_=getattr(Task, field))
+                  for field, value in update_data.items()}
+        if task_data.status:
+            values["status"] = task_data.status
+            statement = statement.where(is_creator | (Task.assigned_to == current_user.id))
+        else:
+            statement = statement.where(is_creator)
+    values["version"] = Task.version + 1
+    tracked = [field for field in TRACKED_FIELDS if field in update_data]
+    for _ in range(3):
+        before = {}
+        guarded = statement
+        if tracked:
+            # Old values for the history entries (the old assignee also loses sight of the task, so their
+            # cached lists are invalidated too). The update only applies to the version they were read at;
+            # if another write lands in between, they are read again.
+            previous = db.query(Task.version, *[getattr(Task, field) for field in tracked]).filter(Task.id == task_id).first()
+            if previous is not None:
+                before = previous._asdict()
+                guarded = statement.where(Task.version == before.pop("version"))
+        row = db.execute(guarded.values(**values).returning(*Task.__table__.c),
+                         execution_options={"synchronize_session": False}).mappings().first()
+        if row is not None or not before or expected_version is not None:
+            break
+        db.rollback()
+    previous_assignee = before.get("assigned_to")
+    if row is None:
+        db.rollback()
+        task = db.query(Task.created_by, Task.assigned_to, Task.version).filter(Task.id == task_id).first()
+        if not task:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+        if current_user.role != "admin" and task.created_by != current_user.id:
+            if task.assigned_to != current_user.id:
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+            if not task_data.status:
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Assignee can only update status")
+        raise version_conflict(task.version)
+    db.commit()
+    invalidate_task_lists(row["created_by"], row["assigned_to"], previous_assignee)
+    task_history.record_changes(task_id, current_user.id, before, row)
+    return dict(row)
+
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_task(task_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def delete_task(task_id: int, if_match: Optional[str] = Header(None), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     if task.created_by != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    expected_version = parse_if_match(if_match)
+    if expected_version is not None and task.version != expected_version:
+        raise version_conflict(task.version)
+    lifted = lift_children(db, task)
+    db.query(TaskLabel).filter(TaskLabel.task_id == task_id).delete(synchronize_session=False)
     db.delete(task)
-    db.commit()
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise version_conflict(db.query(Task.version).filter(Task.id == task_id).scalar() or 0)
+    label_index.remove_task(task_id)
+    task_history.record(task_id, current_user.id, "deleted")
+    if lifted:
+        invalidate_all_task_lists()
+    else:
+        invalidate_task_lists(task.created_by, task.assigned_to)
     return None
\ No newline at end of file
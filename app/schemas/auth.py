@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import Optional
 from app.schemas.user import UserResponse
 
 class Token(BaseModel):
@@ -8,4 +9,7 @@ class Token(BaseModel):
     user: UserResponse
 
 class RefreshTokenRequest(BaseModel):
-    refresh_token: str
\ No newline at end of file
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
\ No newline at end of file
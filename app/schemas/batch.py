@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import Any, List, Optional
+
+class BatchOperation(BaseModel):
+    method: str = Field("GET", pattern="^(GET|POST|PUT|DELETE)$")
+    path: str = Field(..., pattern="^/")
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1)
+
+class BatchResult(BaseModel):
+    status: int
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
@@ -1,20 +1,25 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
+from app.models.task import TASK_STATUSES, TASK_PRIORITIES
+
+TaskStatus = Literal[TASK_STATUSES]
+TaskPriority = Literal[TASK_PRIORITIES]
 
 class TaskCreate(BaseModel):
     title: str = Field(..., min_length=1)
     description: Optional[str] = None
-    status: Optional[str] = "pending"
-    priority: Optional[str] = "medium"
+    status: Optional[TaskStatus] = "pending"
+    priority: Optional[TaskPriority] = "medium"
     due_date: Optional[datetime] = None
     assigned_to: Optional[int] = None
+    parent_id: Optional[int] = None
 
 class TaskUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
-    status: Optional[str] = None
-    priority: Optional[str] = None
+    status: Optional[TaskStatus] = None
+    priority: Optional[TaskPriority] = None
     due_date: Optional[datetime] = None
     assigned_to: Optional[int] = None
 
@@ -22,16 +27,50 @@ class TaskResponse(BaseModel):
     id: int
     title: str
     description: Optional[str]
-    status: str
-    priority: str
+    status: TaskStatus
+    priority: TaskPriority
     due_date: Optional[datetime]
     created_by: int
     assigned_to: Optional[int]
+    parent_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
+    version: int = 1
+    class Config:
+        from_attributes = True
+
+class TaskMove(BaseModel):
+    parent_id: Optional[int] = None
+
+class TaskRollup(BaseModel):
+    task_id: int
+    total_tasks: int
+    completed_tasks: int
+    completion_percentage: float
+
+class TaskLabels(BaseModel):
+    labels: List[str] = Field(..., max_length=50)
+
+class TaskLabelsResponse(BaseModel):
+    task_id: int
+    labels: List[str]
+
+class TaskHistoryEntry(BaseModel):
+    id: int
+    task_id: int
+    changed_by: Optional[int]
+    action: str
+    field: Optional[str]
+    old_value: Optional[str]
+    new_value: Optional[str]
+    changed_at: datetime
     class Config:
         from_attributes = True
 
+class TaskHistoryPage(BaseModel):
+    items: List[TaskHistoryEntry]
+    next_cursor: Optional[str] = None
+
 class TaskStatistics(BaseModel):
     total_tasks: int
     completed_tasks: int
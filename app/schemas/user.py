@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class UserCreate(BaseModel):
@@ -21,5 +21,23 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class UserWithTaskCounts(UserResponse):
+    created_task_count: Optional[int] = None
+    assigned_task_count: Optional[int] = None
+    open_task_count: Optional[int] = None
+
+class UserPage(BaseModel):
+    items: List[UserWithTaskCounts]
+    next_cursor: Optional[str] = None
+
 class RoleUpdate(BaseModel):
-    role: str = Field(..., pattern="^(user|admin)$")
\ No newline at end of file
+    role: str = Field(..., pattern="^(user|admin)$")
+
+class ProvisioningError(BaseModel):
+    line: int
+    email: Optional[str] = None
+    detail: str
+
+class ProvisioningResult(BaseModel):
+    created: int
+    errors: List[ProvisioningError]
\ No newline at end of file
@@ -0,0 +1,60 @@
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import aliased
+from app.database.sharding import shard_engines
+from app.models.archived_task import ArchivedTask
+from app.models.task import Task
+from app.services.task_cache import invalidate_all_task_lists
+
+def archive_completed_tasks(primary: Engine, older_than_days: int, chunk_size: int = 500) -> int:
+    # Moves tasks completed (and untouched) for more than older_than_days from the hot table and every
+    # shard into archived_tasks in the primary database, one short transaction per chunk. Each chunk is
+    # removed with DELETE ... RETURNING, so a task reopened or edited after it was picked is never taken,
+    # and the archive copy is committed before the source lets go, so an interrupted run is safe to repeat.
+    tasks, archived = Task.__table__, ArchivedTask.__table__
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    sources = [source for source in [primary, *shard_engines.values()] if has_tasks_table(source)]
+    moved = 0
+    for source in sources:
+        # Parents keep their live subtasks' parent_id valid: skip tasks with children in this database,
+        # or (on a sharded setup) in any other.
+        children = aliased(tasks)
+        foreign_parents = set()
+        for other in sources:
+            if other is not source:
+                with other.connect() as connection:
+                    foreign_parents.update(connection.scalars(select(tasks.c.parent_id).where(tasks.c.parent_id.is_not(None)).distinct()))
+        stale = (select(tasks.c.id).where(tasks.c.status == "completed", tasks.c.updated_at < cutoff,
+                                          ~select(children.c.id).where(children.c.parent_id == tasks.c.id).exists())
+                 .order_by(tasks.c.id).limit(chunk_size))
+        if foreign_parents:
+            stale = stale.where(tasks.c.id.not_in(foreign_parents))
+        # Runs until nothing is left, since archiving children can make their completed parents eligible.
+        while True:
+            with source.begin() as connection:
+                rows = [dict(row) for row in connection.execute(delete(tasks).where(tasks.c.id.in_(stale)).returning(*tasks.c)).mappings()]
+                if rows:
+                    archived_at = datetime.utcnow()
+                    with primary.begin() if source is not primary else nullcontext(connection) as target:
+                        target.execute(delete(archived).where(archived.c.id.in_([row["id"] for row in rows])))
+                        target.execute(insert(archived), [{**row, "archived_at": archived_at} for row in rows])
+            if not rows:
+                break
+            moved += len(rows)
+    if moved:
+        invalidate_all_task_lists()
+    return moved
+
+def has_tasks_table(source: Engine) -> bool:
+    with source.connect() as connection:
+        return source.dialect.has_table(connection, "tasks")
+
+if __name__ == "__main__":
+    # Run as "python -m app.services.archival", e.g. from cron.
+    from app.main import app  # noqa: F401  imports every model and creates the archive table
+    from app.config import settings
+    from app.database.database import engine
+    from app.services import archival
+    print(f"Archived: {archival.archive_completed_tasks(engine, settings.ARCHIVE_AFTER_DAYS, settings.ARCHIVE_CHUNK_SIZE)}")
@@ -0,0 +1,24 @@
+from typing import Optional
+from app.config import settings
+from app.models.user import User
+from app.utils.cache import GenerationalCache
+from app.utils.singleflight import SingleFlight
+
+ALL_TASKS = "*"
+
+task_list_cache = GenerationalCache(max_entries=settings.TASK_LIST_CACHE_SIZE, max_entry_bytes=settings.TASK_LIST_CACHE_MAX_BYTES,
+                                    ttl_seconds=settings.TASK_LIST_CACHE_TTL_SECONDS)
+# Identical list/statistics reads that arrive together run one query between them.
+task_list_flight = SingleFlight()
+statistics_flight = SingleFlight()
+
+def task_list_key(current_user: User, *params) -> tuple:
+    # Admins see every task, so their entries hang off the global generation; users off their own.
+    scope = ALL_TASKS if current_user.role == "admin" else current_user.id
+    return (scope, task_list_cache.generation(scope), *params)
+
+def invalidate_task_lists(*user_ids: Optional[int]) -> None:
+    task_list_cache.bump([ALL_TASKS, *{user_id for user_id in user_ids if user_id is not None}])
+
+def invalidate_all_task_lists() -> None:
+    task_list_cache.clear()
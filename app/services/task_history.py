@@ -0,0 +1,98 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Optional
+from sqlalchemy import insert
+from app.config import settings
+from app.models.task_history import TaskHistory
+
+TRACKED_FIELDS = ("status", "priority", "assigned_to", "due_date")
+
+def _as_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+class TaskHistoryRecorder:
+    # Write paths only enqueue history rows; a background thread inserts them in batches. A batch that
+    # fails to insert is retried on the next flush, and stop() drains everything left before exit.
+    def __init__(self, batch_size: int, flush_interval: float, queue_size: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=queue_size)
+        self.flushed = 0
+        self.failures = 0
+        self._pending: list = []
+        self._engine = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def record(self, task_id: int, changed_by: Optional[int], action: str, field: Optional[str] = None,
+               old_value: Any = None, new_value: Any = None) -> None:
+        # Blocks only when the flusher has fallen a whole queue behind; history rows are never dropped.
+        self.queue.put({"task_id": task_id, "changed_by": changed_by, "action": action, "field": field,
+                        "old_value": _as_text(old_value), "new_value": _as_text(new_value), "changed_at": datetime.utcnow()})
+
+    def record_changes(self, task_id: int, changed_by: Optional[int], before: dict, after: dict) -> None:
+        for field in TRACKED_FIELDS:
+            if field in before and field in after and before[field] != after[field]:
+                self.record(task_id, changed_by, "updated", field, before[field], after[field])
+
+    def start(self, engine) -> None:
+        # History lives in the primary database even when tasks are sharded, so rows go straight to its engine.
+        if self._thread is not None:
+            return
+        self._engine = engine
+        self._thread = threading.Thread(target=self._run, name="task-history-flusher", daemon=True)
+        self._thread.start()
+        # Covers interpreter exits that skip the application's shutdown handlers.
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            if self._thread is None:
+                return
+            self.queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        running = True
+        while running:
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            if None in batch:
+                running = False
+                batch = [row for row in batch if row is not None]
+                while True:
+                    try:
+                        row = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if row is not None:
+                        batch.append(row)
+            self._pending.extend(batch)
+            if self._pending and not self._flush() and running:
+                time.sleep(self.flush_interval)
+
+    def _flush(self) -> bool:
+        try:
+            with self._engine.begin() as connection:
+                for start in range(0, len(self._pending), self.batch_size):
+                    connection.execute(insert(TaskHistory.__table__), self._pending[start:start + self.batch_size])
+        except Exception:
+            self.failures += 1
+            return False
+        self.flushed += len(self._pending)
+        self._pending = []
+        return True
+
+task_history = TaskHistoryRecorder(batch_size=settings.TASK_HISTORY_BATCH_SIZE, flush_interval=settings.TASK_HISTORY_FLUSH_INTERVAL_SECONDS,
+                                   queue_size=settings.TASK_HISTORY_QUEUE_SIZE)
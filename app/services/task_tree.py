@@ -0,0 +1,53 @@
+from datetime import datetime
+from fastapi import HTTPException, status
+from sqlalchemy import case, func, literal, update
+from sqlalchemy.orm import Session
+from app.models.task import Task
+from app.models.user import User
+from app.utils.pagination import prefix_upper_bound
+
+# Subtrees are read and rewritten through Task.path, so every operation here is a single
+# range scan on ix_tasks_path however deep the tree is.
+
+def children_path(task) -> str:
+    return f"{task.path}{task.id}/"
+
+def in_subtree(task):
+    prefix = children_path(task)
+    return (Task.path >= prefix) & (Task.path < prefix_upper_bound(prefix))
+
+def visible_to(current_user: User):
+    if current_user.role == "admin":
+        return None
+    return (Task.created_by == current_user.id) | (Task.assigned_to == current_user.id)
+
+def get_visible_task(db: Session, task_id: int, current_user: User, not_found: str = "Task not found"):
+    task = db.query(Task.id, Task.path, Task.parent_id, Task.created_by, Task.assigned_to).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    if current_user.role != "admin" and task.created_by != current_user.id and task.assigned_to != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    return task
+
+def move_subtree(db: Session, task, parent) -> None:
+    # Re-roots the task and rewrites the path prefix of all its descendants in one statement.
+    new_path = children_path(parent) if parent is not None else "/"
+    cut = len(children_path(task)) + 1
+    is_task = Task.id == task.id
+    db.execute(update(Task).where(is_task | in_subtree(task)).values(
+        path=case((is_task, new_path), else_=literal(f"{new_path}{task.id}/") + func.substr(Task.path, cut)),
+        parent_id=case((is_task, parent.id if parent is not None else None), else_=Task.parent_id),
+        updated_at=case((is_task, datetime.utcnow()), else_=Task.updated_at),
+        version=case((is_task, Task.version + 1), else_=Task.version),
+    ), execution_options={"synchronize_session": False})
+
+def lift_children(db: Session, task) -> int:
+    # Before a task is deleted its subtree moves up one level, children attaching to its parent.
+    is_child = Task.parent_id == task.id
+    result = db.execute(update(Task).where(in_subtree(task)).values(
+        path=literal(task.path) + func.substr(Task.path, len(children_path(task)) + 1),
+        parent_id=case((is_child, task.parent_id), else_=Task.parent_id),
+        updated_at=case((is_child, datetime.utcnow()), else_=Task.updated_at),
+        version=case((is_child, Task.version + 1), else_=Task.version),
+    ), execution_options={"synchronize_session": False})
+    return result.rowcount
@@ -0,0 +1,196 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database.database import SessionLocal, engine, is_sharded
+from app.database.sharding import move_owner_tasks, task_shard_ids
+from app.models.archived_task import ArchivedTask
+from app.models.label import TaskLabel
+from app.models.task import Task
+from app.models.user import User
+from app.services.task_cache import invalidate_all_task_lists
+from app.services.task_history import task_history
+from app.services.task_tree import lift_children
+from app.utils.label_index import label_index
+from app.utils.security import hash_password
+from app.utils.validators import validate_email, validate_password
+
+def _task_ids(column, user_id: int, chunk_size: Optional[int]):
+    ids = select(Task.id).where(column == user_id)
+    if chunk_size:
+        ids = ids.limit(chunk_size)
+    return ids
+
+def _update_tasks(db: Session, column, user_id: int, values: dict, chunk_size: Optional[int], shard_id: Optional[str] = None) -> List[int]:
+    # Each chunk's ids are read first, so history can be recorded for exactly the tasks that changed.
+    bind_arguments = {"shard_id": shard_id} if shard_id else None
+    updated = []
+    while True:
+        ids = list(db.scalars(_task_ids(column, user_id, chunk_size), bind_arguments=bind_arguments))
+        if ids:
+            db.execute(update(Task).where(Task.id.in_(ids), column == user_id).values(**values, version=Task.version + 1),
+                       execution_options={"synchronize_session": False}, bind_arguments=bind_arguments)
+            updated += ids
+        if not chunk_size or len(ids) < chunk_size:
+            return updated
+        db.commit()
+
+def _lift_subtasks(db: Session, ids: List[int], bind_arguments: Optional[dict]) -> None:
+    # Subtasks of the purged user's tasks can belong to other users (and live in other shards); like delete_task,
+    # each deleted task's subtree moves up a level. Deepest first, so no lift rewrites a path still to be used.
+    parent_ids = set(db.scalars(select(Task.parent_id).where(Task.parent_id.in_(ids))))
+    if not parent_ids:
+        return
+    parents = db.execute(select(Task.id, Task.path, Task.parent_id).where(Task.id.in_(parent_ids)), bind_arguments=bind_arguments).all()
+    for parent in sorted(parents, key=lambda parent: parent.path.count("/"), reverse=True):
+        lift_children(db, parent)
+
+def _delete_owned_tasks(db: Session, user_id: int, chunk_size: Optional[int], shard_id: Optional[str] = None) -> List[int]:
+    # Labels live in the primary database, not next to the tasks, so each chunk's ids are read first.
+    bind_arguments = {"shard_id": shard_id} if shard_id else None
+    deleted = []
+    while True:
+        ids = list(db.scalars(_task_ids(Task.created_by, user_id, chunk_size), bind_arguments=bind_arguments))
+        if ids:
+            _lift_subtasks(db, ids, bind_arguments)
+            db.execute(delete(TaskLabel).where(TaskLabel.task_id.in_(ids)), execution_options={"synchronize_session": False})
+            db.execute(delete(Task).where(Task.id.in_(ids), Task.created_by == user_id), execution_options={"synchronize_session": False}, bind_arguments=bind_arguments)
+            deleted += ids
+        if not chunk_size or len(ids) < chunk_size:
+            return deleted
+        db.commit()
+
+def purge_user(db: Session, user_id: int, owned_tasks: Optional[str], reassign_to: Optional[int] = None,
+               chunk_size: Optional[int] = None, changed_by: Optional[int] = None) -> None:
+    sharded = is_sharded(db)
+    new_assignee = reassign_to if owned_tasks == "reassign" else None
+    deleted, reowned, reassigned = [], [], []
+    for shard_id in task_shard_ids() if sharded else [None]:
+        if owned_tasks == "reassign":
+            reowned += _update_tasks(db, Task.created_by, user_id, {"created_by": reassign_to}, chunk_size, shard_id)
+        else:
+            deleted += _delete_owned_tasks(db, user_id, chunk_size, shard_id)
+        reassigned += _update_tasks(db, Task.assigned_to, user_id, {"assigned_to": new_assignee}, chunk_size, shard_id)
+    archived_owned = list(db.scalars(select(ArchivedTask.id).where(ArchivedTask.created_by == user_id)))
+    if owned_tasks == "reassign":
+        db.execute(update(ArchivedTask).where(ArchivedTask.id.in_(archived_owned)).values(created_by=reassign_to),
+                   execution_options={"synchronize_session": False})
+        reowned += archived_owned
+    else:
+        db.execute(delete(TaskLabel).where(TaskLabel.task_id.in_(archived_owned)), execution_options={"synchronize_session": False})
+        db.execute(delete(ArchivedTask).where(ArchivedTask.id.in_(archived_owned)), execution_options={"synchronize_session": False})
+        deleted += archived_owned
+    archived_assigned = list(db.scalars(select(ArchivedTask.id).where(ArchivedTask.assigned_to == user_id)))
+    db.execute(update(ArchivedTask).where(ArchivedTask.id.in_(archived_assigned)).values(assigned_to=new_assignee),
+               execution_options={"synchronize_session": False})
+    reassigned += archived_assigned
+    db.execute(delete(User).where(User.id == user_id), execution_options={"synchronize_session": False})
+    db.commit()
+    label_index.remove_tasks(deleted)
+    invalidate_all_task_lists()
+    for task_id in deleted:
+        task_history.record(task_id, changed_by, "deleted")
+    for task_id in reowned:
+        task_history.record(task_id, changed_by, "updated", "created_by", user_id, reassign_to)
+    for task_id in reassigned:
+        task_history.record(task_id, changed_by, "updated", "assigned_to", user_id, new_assignee)
+    if sharded and owned_tasks == "reassign":
+        # Reassigned tasks now belong to another owner and have to move to that owner's shard.
+        move_owner_tasks(engine, reassign_to, chunk_size or settings.USER_DELETE_CHUNK_SIZE)
+
+def purge_user_in_background(user_id: int, owned_tasks: Optional[str], reassign_to: Optional[int] = None,
+                             changed_by: Optional[int] = None) -> None:
+    db = SessionLocal()
+    try:
+        purge_user(db, user_id, owned_tasks, reassign_to, chunk_size=settings.USER_DELETE_CHUNK_SIZE, changed_by=changed_by)
+    finally:
+        db.close()
+
+
+hash_pool: Optional[ProcessPoolExecutor] = None
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    global hash_pool
+    if hash_pool is None:
+        hash_pool = ProcessPoolExecutor(max_workers=settings.PROVISIONING_HASH_WORKERS or os.cpu_count())
+    return hash_pool
+
+def parse_user_rows(content_type: str, body: bytes) -> List[Tuple[int, dict]]:
+    text = body.decode("utf-8-sig")
+    if "csv" in content_type:
+        reader = csv.DictReader(io.StringIO(text))
+        return [(reader.line_num, row) for row in reader]
+    rows = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = {}
+            # Valid JSON that is not an object is reported like a line with no fields.
+            rows.append((line_number, row if isinstance(row, dict) else {}))
+    return rows
+
+def provision_users(db: Session, rows: List[Tuple[int, dict]]) -> dict:
+    errors = []
+    accepted = []
+    seen = set()
+    for line, row in rows:
+        name, email, password = (str(row.get(key) or "").strip() for key in ("name", "email", "password"))
+        role = str(row.get("role") or "user").strip()
+        if len(name) < 2 or not email or not password:
+            errors.append({"line": line, "email": email or None, "detail": "name, email and password are required"})
+        elif not validate_email(email):
+            errors.append({"line": line, "email": email, "detail": "Invalid email"})
+        elif role not in ("user", "admin"):
+            errors.append({"line": line, "email": email, "detail": "Invalid role"})
+        elif email in seen:
+            errors.append({"line": line, "email": email, "detail": "Duplicate email in upload"})
+        else:
+            try:
+                validate_password(password)
+            except HTTPException as exc:
+                errors.append({"line": line, "email": email, "detail": exc.detail})
+                continue
+            seen.add(email)
+            accepted.append((line, {"name": name, "email": email, "password": password, "role": role}))
+    existing = set()
+    emails = [values["email"] for _, values in accepted]
+    for start in range(0, len(emails), 500):
+        existing.update(db.scalars(select(User.email).where(User.email.in_(emails[start:start + 500]))))
+    for line, values in accepted:
+        if values["email"] in existing:
+            errors.append({"line": line, "email": values["email"], "detail": "Email already registered"})
+    lines = {values["email"]: line for line, values in accepted}
+    accepted = [values for _, values in accepted if values["email"] not in existing]
+    created = 0
+    if accepted:
+        workers = settings.PROVISIONING_HASH_WORKERS or os.cpu_count() or 1
+        hashes = get_hash_pool().map(hash_password, [values["password"] for values in accepted],
+                                     chunksize=max(1, len(accepted) // (workers * 4)))
+        for values, hashed in zip(accepted, hashes):
+            values["password"] = hashed
+        for start in range(0, len(accepted), settings.PROVISIONING_BATCH_SIZE):
+            batch = accepted[start:start + settings.PROVISIONING_BATCH_SIZE]
+            try:
+                db.execute(insert(User), batch)
+                db.commit()
+            except IntegrityError:
+                # A concurrent registration took some of these emails after the check above.
+                db.rollback()
+                taken = set(db.scalars(select(User.email).where(User.email.in_([values["email"] for values in batch]))))
+                errors.extend({"line": lines[email], "email": email, "detail": "Email already registered"} for email in taken)
+                batch = [values for values in batch if values["email"] not in taken]
+                if batch:
+                    db.execute(insert(User), batch)
+                    db.commit()
+            created += len(batch)
+    errors.sort(key=lambda error: error["line"])
+    return {"created": created, "errors": errors}
\ No newline at end of file
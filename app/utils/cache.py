@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional
+
+class GenerationalCache:
+    # LRU of serialized responses. Keys embed a generation number, so bumping a generation makes
+    # every older entry for that scope unreachable and it simply ages out of the LRU.
+    def __init__(self, max_entries: int, max_entry_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generations: Dict[Hashable, int] = {}
+        # Generation of scopes not bumped yet; clear() raises it so their keys change too.
+        self._base_generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def generation(self, scope: Hashable) -> int:
+        return self._generations.get(scope, self._base_generation)
+
+    def bump(self, scopes: Iterable[Hashable]) -> None:
+        with self._lock:
+            for scope in scopes:
+                self._generations[scope] = self._generations.get(scope, self._base_generation) + 1
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        if len(value) > self.max_entry_bytes:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations = {scope: generation + 1 for scope, generation in self._generations.items()}
+            self._base_generation += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from app.models.idempotency_key import IdempotencyKey
+
+class IdempotencyStore:
+    # Stored responses by idempotency key: an in-memory LRU in front of the idempotency_keys table.
+    # A row with no status code is the claim of a request still running, possibly in another process; it
+    # only lasts lease_seconds, so the claim of a worker that died mid-request frees itself.
+    def __init__(self, engine: Engine, max_entries: int, ttl_seconds: int, lease_seconds: float):
+        self.engine = engine
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self.replays = 0
+
+    def get_cached(self, key: str) -> Optional[dict]:
+        with self._lock:
+            record = self._entries.get(key)
+            if record is None:
+                return None
+            if record["expires"] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return record
+
+    def _cache(self, key: str, record: dict) -> None:
+        with self._lock:
+            self._entries[key] = record
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def claim(self, key: str, fingerprint: str) -> Optional[dict]:
+        # Returns None when this caller now owns the key, otherwise the existing (stored or running) record.
+        table = IdempotencyKey.__table__
+        now = datetime.utcnow()
+        self.prune(now)
+        with self.engine.begin() as connection:
+            connection.execute(delete(table).where(table.c.key == key, table.c.expires_at < now))
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(insert(table).values(key=key, fingerprint=fingerprint, created_at=now,
+                                                        expires_at=now + timedelta(seconds=self.lease_seconds)))
+            return None
+        except IntegrityError:
+            with self.engine.connect() as connection:
+                row = connection.execute(select(table).where(table.c.key == key)).mappings().first()
+        if row is None:
+            return self.claim(key, fingerprint)
+        record = {"fingerprint": row["fingerprint"], "status": row["status_code"], "headers": json.loads(row["headers"] or "[]"),
+                  "body": row["body"] or b"", "expires": time.time() + (row["expires_at"] - now).total_seconds()}
+        if record["status"] is not None:
+            self._cache(key, record)
+        return record
+
+    def complete(self, key: str, fingerprint: str, status: int, headers: List[list], body: bytes) -> None:
+        table = IdempotencyKey.__table__
+        with self.engine.begin() as connection:
+            connection.execute(update(table).where(table.c.key == key).values(status_code=status, headers=json.dumps(headers), body=body,
+                                                                              expires_at=datetime.utcnow() + timedelta(seconds=self.ttl_seconds)))
+        self._cache(key, {"fingerprint": fingerprint, "status": status, "headers": headers, "body": body,
+                          "expires": time.time() + self.ttl_seconds})
+
+    def release(self, key: str) -> None:
+        table = IdempotencyKey.__table__
+        with self.engine.begin() as connection:
+            connection.execute(delete(table).where(table.c.key == key, table.c.status_code.is_(None)))
+
+    def prune(self, now: datetime) -> None:
+        if time.monotonic() - self._last_prune < 60:
+            return
+        self._last_prune = time.monotonic()
+        table = IdempotencyKey.__table__
+        with self.engine.begin() as connection:
+            connection.execute(delete(table).where(table.c.expires_at < now))
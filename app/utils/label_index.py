@@ -0,0 +1,164 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from app.models.label import Label, TaskLabel
+
+class LabelMatch:
+    # Result of a label filter against one snapshot of the index: the tasks carrying every required
+    # label and at least one optional label (None when neither was asked for), and the excluded tasks.
+    def __init__(self, include: Optional[int], exclude: int, positions: Dict[int, int], task_ids: List[int]):
+        self.include = include
+        self.exclude = exclude
+        self.positions = positions
+        self.task_ids = task_ids
+
+    def allows(self, task_id: int) -> bool:
+        position = self.positions.get(task_id)
+        if position is None:
+            return self.include is None
+        if self.include is not None and not self.include >> position & 1:
+            return False
+        return not self.exclude >> position & 1
+
+    def candidate_ids(self, limit: int) -> Optional[List[int]]:
+        # The matching task ids when there are few enough to push into the query as "id IN (...)".
+        if self.include is None:
+            return None
+        bitmap = self.include & ~self.exclude
+        if bitmap.bit_count() > limit:
+            return None
+        bits = bin(bitmap)[:1:-1]
+        ids, position = [], bits.find("1")
+        while position != -1:
+            ids.append(self.task_ids[position])
+            position = bits.find("1", position + 1)
+        return ids
+
+class LabelBitmapIndex:
+    # One bitset per label (a Python int) over dense task positions, so AND/OR/NOT label filters are
+    # word-parallel integer operations instead of joins. Positions only grow between rebuilds.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._positions: Dict[int, int] = {}
+        self._task_ids: List[int] = []
+        self._bitmaps: Dict[str, int] = {}
+        # Counts writes, so a load that raced with one can tell its snapshot is already stale.
+        self._writes = 0
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def _position(self, task_id: int) -> int:
+        position = self._positions.get(task_id)
+        if position is None:
+            position = self._positions[task_id] = len(self._task_ids)
+            self._task_ids.append(task_id)
+        return position
+
+    def load(self, db: Session, attempts: int = 3) -> bool:
+        # Retried when label writes land while the rows are read; if writes keep landing, the current
+        # (incrementally maintained) index is kept and the next refresh tries again.
+        for _ in range(attempts):
+            with self._lock:
+                writes = self._writes
+            pairs = db.query(TaskLabel.task_id, Label.name).join(Label, Label.id == TaskLabel.label_id).order_by(TaskLabel.task_id).all()
+            db.rollback()
+            if self.rebuild(pairs, writes):
+                return True
+        return False
+
+    def rebuild(self, pairs: Iterable[Tuple[int, str]], writes: Optional[int] = None) -> bool:
+        positions: Dict[int, int] = {}
+        task_ids: List[int] = []
+        members: Dict[str, List[int]] = {}
+        for task_id, name in pairs:
+            position = positions.get(task_id)
+            if position is None:
+                position = positions[task_id] = len(task_ids)
+                task_ids.append(task_id)
+            members.setdefault(name, []).append(position)
+        bitmaps = {}
+        for name, label_positions in members.items():
+            bits = bytearray(b"0" * (max(label_positions) + 1))
+            for position in label_positions:
+                bits[position] = ord("1")
+            bitmaps[name] = int(bits[::-1].decode(), 2)
+        with self._lock:
+            if writes is not None and writes != self._writes:
+                return False
+            self._positions, self._task_ids, self._bitmaps = positions, task_ids, bitmaps
+        return True
+
+    def set_task_labels(self, task_id: int, labels: Sequence[str]) -> None:
+        with self._lock:
+            self._writes += 1
+            position = self._position(task_id)
+            bit = 1 << position
+            for name, bitmap in self._bitmaps.items():
+                if bitmap & bit and name not in labels:
+                    self._bitmaps[name] = bitmap & ~bit
+            for name in labels:
+                self._bitmaps[name] = self._bitmaps.get(name, 0) | bit
+
+    def remove_task(self, task_id: int) -> None:
+        self.remove_tasks([task_id])
+
+    def remove_tasks(self, task_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._writes += 1
+            mask = 0
+            for task_id in task_ids:
+                position = self._positions.get(task_id)
+                if position is not None:
+                    mask |= 1 << position
+            if mask:
+                self._bitmaps = {name: bitmap & ~mask for name, bitmap in self._bitmaps.items()}
+
+    def labels_of(self, task_id: int) -> List[str]:
+        with self._lock:
+            position = self._positions.get(task_id)
+            if position is None:
+                return []
+            return sorted(name for name, bitmap in self._bitmaps.items() if bitmap >> position & 1)
+
+    def match(self, all_of: Sequence[str], any_of: Sequence[str], none_of: Sequence[str]) -> LabelMatch:
+        with self._lock:
+            include = None
+            if all_of:
+                include = self._bitmaps.get(all_of[0], 0)
+                for name in all_of[1:]:
+                    include &= self._bitmaps.get(name, 0)
+            if any_of:
+                either = 0
+                for name in any_of:
+                    either |= self._bitmaps.get(name, 0)
+                include = either if include is None else include & either
+            exclude = 0
+            for name in none_of:
+                exclude |= self._bitmaps.get(name, 0)
+            return LabelMatch(include, exclude, self._positions, self._task_ids)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {name: bitmap.bit_count() for name, bitmap in sorted(self._bitmaps.items())}
+
+    def start_refresh(self, session_factory, interval: int) -> None:
+        # Rebuilds from the database on an interval so label writes made by other workers show up
+        # and the positions of deleted tasks are reclaimed.
+        if self._refresh_thread is not None or interval <= 0:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                db = session_factory()
+                try:
+                    self.load(db)
+                except Exception:
+                    db.rollback()
+                finally:
+                    db.close()
+
+        self._refresh_thread = threading.Thread(target=run, name="label-index-refresh", daemon=True)
+        self._refresh_thread.start()
+
+label_index = LabelBitmapIndex()
@@ -0,0 +1,80 @@
+import json
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+class AsyncLogWriter:
+    # Callers only enqueue a dict; a background thread serializes records to JSON lines, writes them
+    # in batches and rotates the file by size. When the queue is full records are dropped and counted.
+    def __init__(self, path: str, max_bytes: int, backups: int, batch_size: int, flush_interval: float, queue_size: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+
+    def write(self, record: dict) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name=f"log-writer:{self.path}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self.queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        self._file = open(self.path, "a", encoding="utf-8")
+        running = True
+        while running:
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            if None in batch:
+                running = False
+                batch = [record for record in batch if record is not None]
+            if batch:
+                self._file.write("".join(json.dumps(self._format(record), default=str) + "\n" for record in batch))
+                self._file.flush()
+                if self._file.tell() >= self.max_bytes:
+                    self._rotate()
+        self._file.close()
+
+    def _format(self, record: dict) -> dict:
+        if "ts" in record:
+            record["ts"] = datetime.fromtimestamp(record["ts"], tz=timezone.utc).isoformat()
+        return record
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
@@ -0,0 +1,106 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.revoked_token import RevokedToken
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class TokenDenylist:
+    # In-memory mirror of revoked_tokens: lookups are a dict probe (behind an optional Bloom filter),
+    # and the table is only read at startup and by the background sync.
+    def __init__(self, use_bloom: bool = False, bloom_capacity: int = 100000):
+        self._entries: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._use_bloom = use_bloom
+        self._bloom_capacity = bloom_capacity
+        self._bloom = BloomFilter(bloom_capacity) if use_bloom else None
+        self._next_prune = 0.0
+        self._last_sync: Optional[datetime] = None
+        self._sync_thread: Optional[threading.Thread] = None
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        if self._bloom is not None and jti not in self._bloom:
+            return False
+        expires = self._entries.get(jti)
+        return expires is not None and expires > time.time()
+
+    def add(self, jti: str, expires: float) -> None:
+        with self._lock:
+            self._entries[jti] = expires
+            if self._bloom is not None:
+                self._bloom.add(jti)
+        if time.time() >= self._next_prune:
+            self.prune()
+
+    def prune(self) -> None:
+        now = time.time()
+        with self._lock:
+            self._entries = {jti: expires for jti, expires in self._entries.items() if expires > now}
+            if self._use_bloom:
+                bloom = BloomFilter(max(self._bloom_capacity, len(self._entries)))
+                for jti in self._entries:
+                    bloom.add(jti)
+                self._bloom = bloom
+            self._next_prune = now + 60
+
+    def revoke(self, db: Session, jti: Optional[str], expires: float) -> None:
+        if not jti or expires <= time.time():
+            return
+        db.merge(RevokedToken(jti=jti, expires_at=datetime.utcfromtimestamp(expires)))
+        db.commit()
+        self.add(jti, expires)
+
+    def sync(self, db: Session) -> None:
+        now = datetime.utcnow()
+        query = db.query(RevokedToken.jti, RevokedToken.expires_at).filter(RevokedToken.expires_at > now)
+        if self._last_sync is not None:
+            # Overlap the previous window a little so rows committed during the last sync are not missed.
+            query = query.filter(RevokedToken.revoked_at >= self._last_sync - timedelta(seconds=5))
+        for jti, expires_at in query:
+            self.add(jti, (expires_at - datetime(1970, 1, 1)).total_seconds())
+        db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+        db.commit()
+        self._last_sync = now
+
+    def start_sync(self, session_factory, interval: int) -> None:
+        if self._sync_thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                db = session_factory()
+                try:
+                    self.sync(db)
+                except Exception:
+                    db.rollback()
+                finally:
+                    db.close()
+
+        self._sync_thread = threading.Thread(target=run, name="token-denylist-sync", daemon=True)
+        self._sync_thread.start()
+
+denylist = TokenDenylist(use_bloom=settings.TOKEN_DENYLIST_BLOOM, bloom_capacity=settings.TOKEN_DENYLIST_BLOOM_CAPACITY)
@@ -0,0 +1,159 @@
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import List, Optional
+from sqlalchemy import event
+from app.config import settings
+from app.utils.log_writer import AsyncLogWriter
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "end", "attributes")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: dict):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+
+    def finish(self) -> None:
+        self.end = time.perf_counter()
+        self.trace.spans.append(self)
+
+    def to_dict(self) -> dict:
+        return {"span_id": self.span_id, "parent_id": self.parent_id, "name": self.name,
+                "start_ms": round((self.start - self.trace.started) * 1000, 3),
+                "duration_ms": round(((self.end or self.start) - self.start) * 1000, 3), "attributes": self.attributes}
+
+class Trace:
+    def __init__(self, trace_id: str, parent_id: Optional[str], sampled: bool):
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.timestamp = time.time()
+        self.spans: List[Span] = []
+
+    def to_dict(self, root: Span) -> dict:
+        return {"trace_id": self.trace_id, "parent_id": self.parent_id, "ts": self.timestamp, "name": root.name,
+                "duration_ms": root.to_dict()["duration_ms"], "attributes": root.attributes,
+                "spans": [span.to_dict() for span in sorted(self.spans, key=lambda span: span.start)]}
+
+current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+pending_checkout: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("pending_checkout", default=None)
+
+def parse_traceparent(value: Optional[str]):
+    # W3C trace context: "00-<32 hex trace id>-<16 hex parent id>-<2 hex flags>"
+    parts = (value or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        return parts[1], parts[2], bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+
+class Tracer:
+    # Every request is recorded; a trace is kept if it was head-sampled (upstream flag or
+    # sample_rate) or, tail-sampled, if it was slow or failed.
+    def __init__(self, sample_rate: float, tail_latency_ms: float, buffer_size: int, writer: Optional[AsyncLogWriter] = None):
+        self.sample_rate = sample_rate
+        self.tail_latency_ms = tail_latency_ms
+        self.buffer: deque = deque(maxlen=buffer_size)
+        self.writer = writer
+        self._lock = threading.Lock()
+
+    def start_trace(self, name: str, traceparent: Optional[str], attributes: dict) -> Span:
+        parsed = parse_traceparent(traceparent)
+        if parsed:
+            trace = Trace(parsed[0], parsed[1], parsed[2])
+        else:
+            trace = Trace(os.urandom(16).hex(), None, random.random() < self.sample_rate)
+        return Span(trace, name, trace.parent_id, attributes)
+
+    def finish_trace(self, root: Span, status_code: int) -> None:
+        root.attributes["status"] = status_code
+        root.finish()
+        duration_ms = (root.end - root.start) * 1000
+        if root.trace.sampled or duration_ms >= self.tail_latency_ms or status_code >= 500:
+            record = root.trace.to_dict(root)
+            with self._lock:
+                self.buffer.append(record)
+            if self.writer is not None:
+                self.writer.write(dict(record))
+
+    def find(self, route: Optional[str] = None, min_duration_ms: float = 0, limit: int = 50) -> List[dict]:
+        with self._lock:
+            traces = list(self.buffer)
+        traces = [trace for trace in reversed(traces)
+                  if trace["duration_ms"] >= min_duration_ms and (route is None or trace["attributes"].get("route") == route)]
+        return traces[:limit]
+
+    def get(self, trace_id: str) -> Optional[dict]:
+        with self._lock:
+            return next((trace for trace in self.buffer if trace["trace_id"] == trace_id), None)
+
+@contextmanager
+def span(name: str, **attributes):
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = current_span.set(child)
+    try:
+        yield child
+    finally:
+        current_span.reset(token)
+        child.finish()
+
+def instrument_engine(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        parent = current_span.get()
+        if parent is not None:
+            conn.info.setdefault("trace_spans", []).append(
+                Span(parent.trace, "sql", parent.span_id, {"statement": statement[:200], "executemany": executemany}))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            sql_span = spans.pop()
+            sql_span.attributes["rowcount"] = cursor.rowcount
+            sql_span.finish()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        spans = exception_context.connection.info.get("trace_spans") if exception_context.connection is not None else None
+        if spans:
+            sql_span = spans.pop()
+            sql_span.attributes["error"] = type(exception_context.original_exception).__name__
+            sql_span.finish()
+
+    @event.listens_for(engine, "engine_connect")
+    def engine_connect(conn):
+        checkout = pending_checkout.get()
+        if checkout is not None:
+            pending_checkout.set(None)
+            checkout.finish()
+
+def instrument_sessions(session_class) -> None:
+    # The ORM asks for a connection on a session's first statement; time it until the engine hands one over.
+    @event.listens_for(session_class, "do_orm_execute")
+    def do_orm_execute(orm_execute_state):
+        parent = current_span.get()
+        if parent is not None and not orm_execute_state.session.in_transaction():
+            pending_checkout.set(Span(parent.trace, "db.checkout", parent.span_id, {}))
+
+trace_writer = None
+if settings.TRACE_ENABLED and settings.TRACE_FILE_PATH:
+    trace_writer = AsyncLogWriter(settings.TRACE_FILE_PATH, max_bytes=settings.ACCESS_LOG_MAX_BYTES, backups=settings.ACCESS_LOG_BACKUPS,
+                                  batch_size=settings.ACCESS_LOG_BATCH_SIZE, flush_interval=settings.ACCESS_LOG_FLUSH_INTERVAL_SECONDS,
+                                  queue_size=settings.ACCESS_LOG_QUEUE_SIZE)
+tracer = Tracer(settings.TRACE_SAMPLE_RATE, settings.TRACE_TAIL_LATENCY_MS, settings.TRACE_BUFFER_SIZE, trace_writer)
\ No newline at end of file
@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+MAX_CAPTURED_BODY = 65536
+# Values under these keys are enums, ids or flags that shape the query; every other string is replaced
+# by a "<str:N>" placeholder keeping only its length. Paths (batch operations) keep only their query's kept keys.
+KEPT_KEYS = {"status", "priority", "role", "sort", "fields", "limit", "days", "direct", "include_archived", "include_task_counts",
+             "owned_tasks", "older_than_days", "min_duration_ms", "method", "path", "due_date"}
+
+def _map_query(path: str, convert) -> str:
+    path, separator, query = path.partition("?")
+    if not separator:
+        return path
+    return path + "?" + urlencode([(name, convert(item, name)) for name, item in parse_qsl(query, keep_blank_values=True)])
+
+def sanitize(value: Any, key: Optional[str] = None) -> Any:
+    if key == "path" and isinstance(value, str):
+        return _map_query(value, sanitize)
+    if isinstance(value, dict):
+        return {name: sanitize(item, name) for name, item in value.items()}
+    if isinstance(value, list):
+        return [sanitize(item, key) for item in value]
+    if isinstance(value, str) and key not in KEPT_KEYS:
+        return f"<str:{len(value)}>"
+    return value
+
+_unique = itertools.count()
+
+def materialize(value: Any, key: Optional[str] = None) -> Any:
+    # Turns placeholders back into values the API accepts: unique emails, valid passwords, filler text.
+    if key == "path" and isinstance(value, str):
+        return _map_query(value, materialize)
+    if isinstance(value, dict):
+        return {name: materialize(item, name) for name, item in value.items()}
+    if isinstance(value, list):
+        return [materialize(item, key) for item in value]
+    if isinstance(value, str) and value.startswith("<str:") and value.endswith(">"):
+        length = int(value[5:-1])
+        if key == "email":
+            return f"replay{next(_unique)}-{time.time_ns()}@example.com"
+        if key == "password":
+            return "Replay1" + "x" * max(length - 7, 1)
+        return "x" * max(length, 1)
+    return value
+
+def load_capture(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as capture:
+        records = [json.loads(line) for line in capture if line.strip()]
+    for record in records:
+        if isinstance(record["ts"], str):
+            record["ts"] = datetime.fromisoformat(record["ts"]).timestamp()
+    return sorted(records, key=lambda record: record["ts"])
+
+def peak_concurrency(records: List[dict]) -> int:
+    events = sorted([(record["ts"], 1) for record in records] + [(record["ts"] + record["duration_ms"] / 1000, -1) for record in records])
+    peak = current = 0
+    for _, change in events:
+        current += change
+        peak = max(peak, current)
+    return max(peak, 1)
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+def summarize(results: List[tuple]) -> Dict[str, dict]:
+    by_route = defaultdict(list)
+    for route, status_code, latency_ms in results:
+        by_route[route].append((status_code, latency_ms))
+        by_route["*"].append((status_code, latency_ms))
+    report = {}
+    for route, samples in sorted(by_route.items()):
+        latencies = [latency for _, latency in samples]
+        statuses = defaultdict(int)
+        for status_code, _ in samples:
+            statuses[str(status_code)] += 1
+        report[route] = {"count": len(samples), "statuses": dict(statuses), "mean_ms": round(sum(latencies) / len(latencies), 3),
+                         "p50_ms": round(percentile(latencies, 0.5), 3), "p90_ms": round(percentile(latencies, 0.9), 3),
+                         "p99_ms": round(percentile(latencies, 0.99), 3), "max_ms": round(max(latencies), 3)}
+    return report
+
+class TokenSource:
+    # Bearer tokens for captured user ids: given explicitly, or minted from the local database in-process.
+    def __init__(self, tokens: Dict[str, str], mint: bool):
+        self.tokens = tokens
+        self.mint = mint
+
+    def __call__(self, user_id: Optional[int]) -> Optional[str]:
+        if user_id is None:
+            return None
+        token = self.tokens.get(str(user_id)) or self.tokens.get("*")
+        if token is None and self.mint:
+            from app.database.database import SessionLocal
+            from app.models.user import User
+            from app.routes.auth import issue_tokens
+            db = SessionLocal()
+            try:
+                user = db.query(User).filter(User.id == user_id).first()
+                token = issue_tokens(user)["access_token"] if user else None
+            finally:
+                db.close()
+            self.tokens[str(user_id)] = token
+        return token
+
+async def replay(records: List[dict], client, tokens: TokenSource, speed: Optional[float], concurrency: int) -> List[tuple]:
+    # speed=None replays back to back with at most `concurrency` requests in flight; otherwise requests
+    # start at their captured offsets divided by speed, overlapping exactly as they did when captured.
+    results = []
+    limit = asyncio.Semaphore(concurrency)
+
+    async def send(record: dict) -> None:
+        headers = {}
+        token = tokens(record.get("user_id"))
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        params = [(key, materialize(value, key)) for key, value in record.get("query", [])]
+        body = materialize(record["body"]) if record.get("body") is not None else None
+        content = None
+        if body is None and record.get("body_bytes"):
+            headers["Content-Type"] = record.get("content_type") or "application/octet-stream"
+            content = b""
+        started = time.perf_counter()
+        try:
+            response = await client.request(record["method"], record["path"], params=params, json=body, content=content, headers=headers)
+            status_code = response.status_code
+        except Exception:
+            status_code = 0
+        results.append((f"{record['method']} {record['route']}", status_code, (time.perf_counter() - started) * 1000))
+
+    async def send_limited(record: dict) -> None:
+        async with limit:
+            await send(record)
+
+    tasks = []
+    if speed is None:
+        tasks = [asyncio.create_task(send_limited(record)) for record in records]
+    elif records:
+        origin, clock = records[0]["ts"], time.perf_counter()
+        for record in records:
+            delay = (record["ts"] - origin) / speed - (time.perf_counter() - clock)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(record)))
+    await asyncio.gather(*tasks)
+    return results
+
+async def run(args) -> Dict[str, dict]:
+    import httpx
+    records = load_capture(args.capture)
+    tokens = TokenSource(dict(token.split("=", 1) if "=" in token else ("*", token) for token in args.token), mint=args.url is None)
+    speed = None if args.speed == "max" else float(args.speed)
+    concurrency = args.concurrency or peak_concurrency(records)
+    started = time.perf_counter()
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            results = await replay(records, client, tokens, speed, concurrency)
+    else:
+        from app.main import app
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://replay", timeout=60) as client:
+                results = await replay(records, client, tokens, speed, concurrency)
+    elapsed = time.perf_counter() - started
+    report = summarize(results)
+    print(f"Replayed {len(results)} requests in {elapsed:.2f}s ({len(results) / elapsed if elapsed else 0:.1f} req/s), concurrency {concurrency}")
+    print(f"{'route':<55} {'count':>6} {'errors':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for route, stats in report.items():
+        errors = sum(count for status_code, count in stats["statuses"].items() if int(status_code) >= 500 or int(status_code) == 0)
+        print(f"{route:<55} {stats['count']:>6} {errors:>6} {stats['p50_ms']:>9} {stats['p90_ms']:>9} {stats['p99_ms']:>9} {stats['max_ms']:>9}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+    return report
+
+if __name__ == "__main__":
+    # python -m app.utils.traffic logs/traffic.jsonl [--url http://host:8000] [--speed 1|N|max] [--token [USER_ID=]TOKEN]
+    parser = argparse.ArgumentParser(description="Replay a captured traffic file and report latency per route")
+    parser.add_argument("capture")
+    parser.add_argument("--url", help="replay against a running server instead of the app in-process")
+    parser.add_argument("--speed", default="1", help="1 for real time, N for N times faster, max for back to back")
+    parser.add_argument("--concurrency", type=int, help="in-flight limit at max speed (default: the capture's peak)")
+    parser.add_argument("--token", action="append", default=[], help="bearer token for USER_ID, or for every user without USER_ID=")
+    parser.add_argument("--json", help="also write the report to this file")
+    asyncio.run(run(parser.parse_args()))
@@ -1,5 +1,7 @@
 import re
+from typing import List, Optional, Type
 from fastapi import HTTPException, status
+from pydantic import BaseModel
 
 def validate_email(email: str) -> bool:
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -13,4 +15,13 @@ def validate_password(password: str) -> None:
     if not re.search(r'[a-z]', password):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password must contain lowercase")
     if not re.search(r'\d', password):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password must contain number")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password must contain number")
+
+def validate_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    requested = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in model.model_fields]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested or None
\ No newline at end of file
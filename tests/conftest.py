@@ -0,0 +1,22 @@
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/tests.db"
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "100000")
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def register(client):
+    def register(email: str, role: str = "user") -> tuple:
+        client.post("/api/v1/auth/register", json={"name": "Test User", "email": email, "password": "Passw0rdX", "role": role})
+        login = client.post("/api/v1/auth/login", json={"email": email, "password": "Passw0rdX"}).json()
+        return {"Authorization": f"Bearer {login['access_token']}"}, login["user"]["id"]
+    return register
@@ -0,0 +1,53 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+from app.database.database import engine
+from app.models.task import Task
+
+FULL_SCAN = re.compile(r"\bSCAN tasks(_\d+)?\b")
+
+@pytest.fixture(scope="module")
+def headers(register):
+    headers, user_id = register("planner@example.com")
+    _, other_id = register("other@example.com")
+    now = datetime.utcnow()
+    rows = [{"title": f"task {i}", "status": i % 3, "priority": i % 3, "created_by": (user_id, other_id)[i % 2],
+             "assigned_to": (other_id, user_id, None)[i % 3], "due_date": now + timedelta(days=i % 40 - 20) if i % 4 else None,
+             "path": "/", "created_at": now, "updated_at": now} for i in range(2000)]
+    with engine.begin() as connection:
+        connection.execute(insert(Task.__table__), rows)
+    return headers
+
+def task_query_plans(client: TestClient, path: str, headers: dict) -> list:
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")) and "tasks" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        response = client.get(path, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert response.status_code == 200, response.text
+    assert statements, f"no task queries captured for {path}"
+    with engine.connect() as connection:
+        return [(statement, [row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)])
+                for statement, parameters in statements]
+
+@pytest.mark.parametrize("path", [
+    "/api/v1/tasks/",
+    "/api/v1/tasks/?status=pending&priority=high",
+    "/api/v1/tasks/?status=in_progress&sort=-due_date",
+    "/api/v1/tasks/statistics",
+    "/api/v1/tasks/overdue",
+    "/api/v1/tasks/upcoming?days=30",
+])
+def test_user_task_queries_use_indexes(client, headers, path):
+    for statement, plan in task_query_plans(client, path, headers):
+        scans = [detail for detail in plan if FULL_SCAN.search(detail)]
+        assert not scans, f"{path} scans tasks: {scans}\n{statement}\n" + "\n".join(plan)
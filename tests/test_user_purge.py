@@ -0,0 +1,23 @@
+from sqlalchemy import text
+from app.database.database import engine
+
+def test_purge_lifts_subtasks_owned_by_other_users(client, register):
+    admin, _ = register("purge-admin@example.com", "admin")
+    owner, owner_id = register("purge-owner@example.com")
+    assignee, assignee_id = register("purge-assignee@example.com")
+    root = client.post("/api/v1/tasks/", json={"title": "root"}, headers=owner).json()
+    parent = client.post("/api/v1/tasks/", json={"title": "parent", "assigned_to": assignee_id, "parent_id": root["id"]}, headers=owner).json()
+    child = client.post("/api/v1/tasks/", json={"title": "child", "parent_id": parent["id"]}, headers=assignee).json()
+    grandchild = client.post("/api/v1/tasks/", json={"title": "grandchild", "parent_id": child["id"]}, headers=assignee).json()
+
+    response = client.delete(f"/api/v1/admin/users/{owner_id}", params={"owned_tasks": "delete"}, headers=admin)
+    assert response.status_code == 204
+
+    lifted = client.get(f"/api/v1/tasks/{child['id']}", headers=assignee).json()
+    assert lifted["parent_id"] is None
+    assert client.get(f"/api/v1/tasks/{grandchild['id']}", headers=assignee).json()["parent_id"] == child["id"]
+    with engine.connect() as connection:
+        paths = dict(connection.execute(text("SELECT id, path FROM tasks WHERE id IN (:child, :grandchild)"),
+                                        {"child": child["id"], "grandchild": grandchild["id"]}).all())
+        assert paths == {child["id"]: "/", grandchild["id"]: f"/{child['id']}/"}
+        assert connection.exec_driver_sql("PRAGMA foreign_key_check(tasks)").all() == []